@@ -1,140 +1,90 @@
 import requests
 import asyncio
 import aiohttp
-import re
 import time
 from datetime import datetime
 #from token_revival import TokenRevivalMonitor
-from env import TOKEN, MULTI_ALERT_WEBHOOK, TWOX_WEBHOOK
+from env import MULTI_ALERT_WEBHOOK, TWOX_WEBHOOK
 from storetransactions import TransactionTracker
+from descriptionstore import descriptions
+from dexscreener import dex_client, TokenSnapshot
+from ratelimiter import market_data_limiter
+from alertcoalescer import alert_coalescer
+from embedfields import embed_parser
+from categoryindex import CategoryIndex, CATEGORIES, FRESH_MASK, SWT_MASK, category_names
+from alertrules import alert_rules
+from statestore import StateStore
 from machannelscraper import ADScraper
+from discordclient import DiscordClient, snowflake_time
+from discordgateway import GatewayClient, INGESTION_MODE
+from pipeline import EventPipeline, message_key
+from dedup import BoundedDedup
+from cursorstore import CursorStore
+import create_tables
 
 
-class DexScreenerAPI:
+class CaBuyTotals:
+    """Transactions seen for one CA with running SOL buy totals per wallet category"""
+    __slots__ = ('descriptions', 'fresh_descriptions', 'sol_buys')
+
     def __init__(self):
-        self.reset_data()
-    
-    def reset_data(self):
-        self.token_ca = None
-        self.token_mc = None
-        self.token_created_at = None
-
-        self.token_5m_vol = None
-        self.token_1h_vol = None
-        self.token_6h_vol = None
-        self.token_24h_vol = None
-
-        self.token_5m_buys = None
-        self.token_5m_sells = None
-        self.token_1h_buys = None
-        self.token_1h_sells = None
-        self.token_6h_buys = None
-        self.token_6h_sells = None
-        self.token_24h_buys = None
-        self.token_24h_sells = None
-
-        self.token_5m_price_change = None
-        self.token_1h_price_change = None
-        self.token_6h_price_change = None
-        self.token_24h_price_change = None
-
-        self.token_liquidity = None
-
-        self.has_tg = False
-        self.has_x = False
-        self.x_link = None
-        self.tg_link = None
-        self.token_on_dex = False
-        self.token_on_pump = False
-        
-        self.token_dex_url = None
-        
-    async def fetch_token_data_from_dex(self, session, ca):
-        self.reset_data()
-        print(f"\n=== Fetching DexScreener Data for {ca[:8]}... ===")
+        self.descriptions = {}   # (description id, channel_name) -> None, kept in insertion order
+        self.fresh_descriptions = set()   # description ids
+        self.sol_buys = dict.fromkeys(CATEGORIES, 0)
+
+    def add(self, tx_description, channel_name, swap):
+        """Record a transaction once and fold its SOL buy into the totals. Returns False for repeats"""
+        description_id = descriptions.add(tx_description)
+        key = (description_id, channel_name)
+        if key in self.descriptions:
+            descriptions.release(description_id)
+            return False
+        self.descriptions[key] = None
+
+        if swap and swap.is_buy and swap.sol_amount > 0:
+            category = channel_name
+            # Freshly funded wallets count once as Fresh whichever channel reported them
+            if channel_name == 'Fresh' or 'freshly funded wallet' in tx_description.lower():
+                if description_id in self.fresh_descriptions:
+                    return True
+                self.fresh_descriptions.add(description_id)
+                category = 'Fresh'
+            if category in self.sol_buys:
+                self.sol_buys[category] += swap.sol_amount
+        return True
+
+    def export(self):
+        return {
+            'descriptions': self.items(),
+            'fresh_descriptions': [descriptions.get(description_id) for description_id in self.fresh_descriptions],
+            'sol_buys': dict(self.sol_buys)
+        }
 
-        url = f"https://api.dexscreener.com/latest/dex/search?q={ca}"
-        try:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    print(f"[ERROR] Dex Screener API Returned Status: {response.status}")
-                    return
-                
-                json_data = await response.json()
-                if not json_data or 'pairs' not in json_data or not json_data['pairs']:
-                    print(f"[INFO] No pairs found for {ca[:8]}... - Token might be on Pump")
-                    self.token_on_pump = True
-                    return
-                
-                self.token_on_dex = True
-
-                found_pair = False
-                for pair in json_data['pairs']:
-                    found_pair = True
-                    print("\nToken Metrics:")
-                    #get mc
-                    self.token_mc = float(pair.get('fdv', 0))
-                    print(f"- Market Cap: ${self.token_mc:,.2f}")
-                    #self.token_name = pair.get('baseToken', {}).get('name', '')
-                    #print(f"- Token Name: {self.token_name}")
-
-                    #get volume
-                    volume_data = pair.get('volume', {})
-                    self.token_5m_vol = float(volume_data.get('m5', 0))
-                    self.token_1h_vol = float(volume_data.get('h1', 0))
-                    self.token_6h_vol = float(volume_data.get('h6', 0))
-                    self.token_24h_vol = float(volume_data.get('h24', 0))
-                    print(f"- 1h Volume: ${self.token_1h_vol:,.2f}")
-
-                    #get buys & sells
-                    txns_data = pair.get('txns', {})
-                    m5_txns = txns_data.get('m5', {})
-                    self.token_5m_buys = int(m5_txns.get('buys', 0))
-                    self.token_5m_sells = int(m5_txns.get('sells', 0))
-                    h1_txns = txns_data.get('h1', {})
-                    self.token_1h_buys = int(h1_txns.get('buys', 0))
-                    self.token_1h_sells = int(h1_txns.get('sells', 0))
-                    h24_txns = txns_data.get('h24', {})
-                    self.token_24h_buys = int(h24_txns.get('buys', 0))
-                    self.token_24h_sells = int(h24_txns.get('sells', 0))
-
-                    #get price change
-                    priceChange_data = pair.get('priceChange', {})
-                    self.token_5m_price_change = priceChange_data.get('m5', 0)
-                    self.token_1h_price_change = priceChange_data.get('h1', 0)
-                    self.token_24h_price_change = priceChange_data.get('h24', 0)
-
-                    #get liquidity
-                    liquidity_data = pair.get('liquidity', {})
-                    self.token_liquidity = float(liquidity_data.get('usd', 0))
-                    print(f"- Liquidity: ${self.token_liquidity:,.2f}")
-                    
-                    #x, tg, and dex url
-                    info = pair.get('info', {})
-                    socials = info.get('socials', [])
-                    for social in socials:
-                        if social['type'] == 'telegram':
-                            self.has_tg = True
-                            self.tg_link = social.get('url', 'No Telegram Link')
-                        if social['type'] == 'twitter':
-                            self.has_x = True
-                            self.x_link = social.get('url', 'No Twitter Link')
-                    self.token_dex_url = pair.get('url', '')
-                    
-                    print("\nSocial Links:")
-                    print(f"- Telegram: {'Yes' if self.has_tg else 'No'}")
-                    print(f"- Twitter: {'Yes' if self.has_x else 'No'}")
-                    print(f"- DEX URL: {self.token_dex_url}")
-                    break
-                    
-        except Exception as e:
-            print(f"[ERROR] Error in fetching Data from Dex for {ca[:8]}...: \n{str(e)}")
+    @classmethod
+    def restore(cls, state):
+        totals = cls()
+        for tx_description, channel_name in state['descriptions']:
+            totals.descriptions[(descriptions.add(tx_description), channel_name)] = None
+        for tx_description in state['fresh_descriptions']:
+            description_id = descriptions.find(tx_description)
+            if description_id is not None:
+                totals.fresh_descriptions.add(description_id)
+        totals.sol_buys.update(state['sol_buys'])
+        return totals
+
+    def items(self):
+        """(tx_description, channel_name) pairs in the order they were seen"""
+        return [(descriptions.get(description_id), channel) for description_id, channel in self.descriptions]
+
+    def release(self):
+        for description_id, _ in self.descriptions:
+            descriptions.release(description_id)
+        self.descriptions.clear()
+        self.fresh_descriptions.clear()
 
 
 class AlefDaoScraper:
     def __init__(self):
-        self.url = "https://discord.com/api/v10/channels/{}/messages"
-        self.dex = DexScreenerAPI()
         self.tracker = TransactionTracker()
 
         self.last_message_ids = {}
@@ -142,295 +92,285 @@ class AlefDaoScraper:
         self.original_mcs = {}
         self.token_volume_data = {}
         self.monitoring_tasks = {}
-        self.ca_to_tx_descriptions = {}  # Added for tracking transactions
+        self.ca_buy_totals = {}  # ca -> CaBuyTotals
 
         self.sol_tracker = SolAmountTracker()
+        self.pipeline = EventPipeline()
+        self.cursor_store = CursorStore()
+
+        #wallet categories each CA has been bought by within the correlation window
+        self.category_index = CategoryIndex(on_evict=self.forget_ca)
+        self.monitor_duration = 24 * 3600
 
-        #wallet sets
-        self.high_freq_cas = set()
-        self.legend_cas = set()
-        self.kol_alpha_cas = set()
-        self.kol_regular_cas = set()
-        self.whale_cas = set()
-        self.smart_cas = set()
-        self.challenge_cas = set()
-        self.degen_cas = set()
-        self.insider_wallet_cas = set()
-        self.fresh_cas = set()
-        self.fresh_5sol_1m_mc_cas = set()
-        self.fresh_1h_cas = set()
+        #per-CA state survives restarts through a snapshot + append-only log
+        self.state_store = StateStore(self.export_ca, self.import_ca, self.known_cas)
 
         #webhooks
         self.multi_alert_webhook = MULTI_ALERT_WEBHOOK
         self.twox_webhook = TWOX_WEBHOOK
 
+        #embed schema used by each channel processor
+        self.message_schemas = {
+            self.swt_process_messages: 'swt',
+            self.degen_process_messages: 'swt',
+            self.fresh_channels_process_messages: 'fresh'
+        }
+
     
-    async def swt_fetch_messages(self, session, channel_id, ca_set, channel_name):
-        headers = {'authorization': TOKEN}
+    def forget_ca(self, ca):
+        """Drop per-CA state once none of its categories are inside the correlation window"""
+        totals = self.ca_buy_totals.pop(ca, None)
+        if totals:
+            totals.release()
+        self.sol_tracker.forget(ca)
+        self.tracker.forget(ca)
+        alert_rules.forget(ca)
+        if ca not in self.monitoring_tasks:
+            self.multi_alerted_cas.discard(ca)
+        self.state_store.mark(ca)
+
+    def known_cas(self):
+        return (self.category_index.entries.keys() | self.ca_buy_totals.keys() | self.multi_alerted_cas
+                | self.sol_tracker.ca_data.keys() | self.sol_tracker.sol_alerted_cas
+                | self.tracker.tracked_tokens.keys())
+
+    def export_ca(self, ca):
+        """Copy of all correlation and alert state kept for `ca`, or None when there is none"""
+        totals = self.ca_buy_totals.get(ca)
+        state = {
+            'multi_alerted': ca in self.multi_alerted_cas,
+            'categories': self.category_index.export_ca(ca),
+            'buy_totals': totals.export() if totals else None,
+            'sol_tracker': self.sol_tracker.export_ca(ca),
+            'tracker': self.tracker.export_ca(ca),
+            'alert_rules': alert_rules.export_ca(ca)
+        }
+        return state if any(state.values()) else None
 
-        processed_messages = set()
-        url = self.url.format(channel_id)
+    def import_ca(self, ca, state):
+        if state['multi_alerted']:
+            self.multi_alerted_cas.add(ca)
+        if state['categories']:
+            self.category_index.import_ca(ca, state['categories'])
+        if state['buy_totals']:
+            self.ca_buy_totals[ca] = CaBuyTotals.restore(state['buy_totals'])
+        if state['sol_tracker']:
+            self.sol_tracker.import_ca(ca, state['sol_tracker'])
+        if state['tracker']:
+            self.tracker.import_ca(ca, state['tracker'])
+        if state['alert_rules']:
+            alert_rules.import_ca(ca, state['alert_rules'])
+
+
+    async def enqueue_message(self, session, message, channel_name, processor):
+        """Hand a fetched message to the worker pool instead of processing it inline"""
+        key = message_key(message, self.message_schemas.get(processor, 'swt'), channel_name)
+        if message.get('channel_id'):
+            self.cursor_store.started(message['channel_id'], message['id'])
+        await self.pipeline.put(key, self.process_and_commit, processor, session, message, channel_name)
+
+    async def process_and_commit(self, processor, session, message, channel_name):
+        """Run the channel's processor, then let the message's channel cursor move past it"""
+        try:
+            await processor(session, message, channel_name)
+        finally:
+            if message.get('channel_id'):
+                self.cursor_store.finished(message['channel_id'], message['id'])
+
+    async def swt_fetch_messages(self, discord, channel_id, channel_name):
+        processed_messages = BoundedDedup(snowflake=True)
 
         while True:
             try:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        messages = await response.json()
-                        if messages:
-                            latest_message = messages[0]
-                            message_id = latest_message['id']
-                            if message_id not in processed_messages:
-                                processed_messages.add(message_id)
-                                print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] New message in {channel_name}")
-                                await self.swt_process_messages(session, latest_message, ca_set, channel_name)
-                    else:
-                        print(f"[ERROR] Failed to fetch messages from {channel_name}: Status {response.status}")
+                status, messages = await discord.fetch_new_messages(channel_id, self.last_message_ids)
+                if status == 200:
+                    for message in messages:
+                        message_id = message['id']
+                        if message_id not in processed_messages:
+                            processed_messages.add(message_id)
+                            print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] New message in {channel_name}")
+                            await self.enqueue_message(discord.session, message, channel_name, self.swt_process_messages)
+                else:
+                    print(f"[ERROR] Failed to fetch messages from {channel_name}: Status {status}")
                 await asyncio.sleep(5)
             except Exception as e:
                 print(f"[ERROR] Exception in {channel_name} channel: {str(e)}")
                 await asyncio.sleep(5)
 
-    async def swt_process_messages(self, session, message, ca_set, channel_name):
+    async def swt_process_messages(self, session, message, channel_name):
         try:
-            embeds = message.get('embeds', [])
-            if not embeds:
+            parsed = embed_parser.parse(message, 'swt')
+            if parsed is None:
                 print(f"[{channel_name}] No embeds found in message")
                 return
 
-            embed = embeds[0]
-            tx_description = embed.get('description', '')
-            
+            tx_description = parsed['description']
             if not tx_description:
                 print(f"[{channel_name}] No transaction description found")
                 return
-            
-            description_lower = tx_description.lower()
-            
-            
-            
+
             # Check if this is a swap transaction
-            if "swapped" not in description_lower:
+            if "swapped" not in tx_description.lower():
                 return
 
-            # If transaction contains " for x sol " pattern, it's a sell
-
             #print(f"\n=== Processing Message from {channel_name} ===")
             print(f"Transaction Description: {tx_description[:100]}...")
 
-            fields = embed.get('fields', [])
-            for field in fields:
-                token_name = field.get('name', '').strip().lower()
-                if token_name not in {'sol', 'useful links', 'buy with bonkbot', 'token address'}:
-                    ca = field.get('value', '')
-                    if ca and ca not in {'So11111111111111111111111111111111111111112', '[Wallet]', '[Neo]'}:
-
-                        if "swapped" and "SOL for" in tx_description:
-                            await self.tracker.process_buy_transaction(ca, token_name, tx_description)
-                        elif "for" and "SOL on" in tx_description:
-                            await self.tracker.process_sell_transaction(ca, token_name, tx_description)
-
-                        sol_amount = self.extract_sol_buy_amount(tx_description)
-                        if sol_amount > 0:
-                            wallet_type = 'fresh' if 'fresh' in channel_name.lower() else 'swt'
-
-                            if sol_amount >= 5.0:
-                                await self.sol_tracker.add_transaction(
-                                    ca=ca,
-                                    sol_amount=sol_amount,
-                                    tx_description=tx_description,
-                                    channel_name=channel_name,
-                                    wallet_type=wallet_type,
-                                    token_name=token_name
-                                )
-                        
-                        ca_set.add(ca)
-                        #print(f"Found new token:")
-                        #print(f"- Name: {token_name}")
-                        #print(f"- Contract: {ca[:20]}...")
-                        #print(f"- Channel: {channel_name}")
-                        
-                        if ca not in self.ca_to_tx_descriptions:
-                            self.ca_to_tx_descriptions[ca] = []
-                        if (tx_description, channel_name) not in self.ca_to_tx_descriptions[ca]:
-                            self.ca_to_tx_descriptions[ca].append((tx_description, channel_name))
-                            print(f"- Added new transaction description")
-
-                        await self.check_for_multialert(session, token_name, ca)
-                        return
+            ca = parsed.get('ca')
+            if ca:
+                await self.record_swap(session, ca, parsed['token_name'], tx_description, parsed['swap'], channel_name,
+                                       snowflake_time(message['id']))
 
             #print("=== Message Processing Complete ===\n")
 
         except Exception as e:
             print(f"[ERROR] Error Processing SWT Messages: {str(e)}")
 
-    async def degen_fetch_messages(self, session, channel_id, ca_set, channel_name):
-        headers = {'authorization': TOKEN}
+    async def record_swap(self, session, ca, token_name, tx_description, swap, channel_name, seen_at):
+        """Shared SWT / fresh handling once a message's CA and swap are known"""
+        sol_amount = 0
+        if swap and swap.is_buy:
+            await self.tracker.process_buy_transaction(ca, token_name, tx_description, swap, seen_at)
+            sol_amount = swap.sol_amount
+        elif swap:
+            await self.tracker.process_sell_transaction(ca, token_name, tx_description, swap, seen_at)
+
+        # Nothing else is kept for a buy the correlation window has already passed, since only
+        # an index entry expiring would ever clean it up; the tracker's record goes too unless
+        # the CA is still in the window
+        if not self.category_index.add(ca, channel_name, seen_at):
+            if ca in self.category_index:
+                self.state_store.mark(ca)
+            else:
+                self.forget_ca(ca)
+            return
 
-        processed_messages = set()
-        url = self.url.format(channel_id)
+        if sol_amount >= 5.0:
+            wallet_type = 'fresh' if 'fresh' in channel_name.lower() else 'swt'
+            await self.sol_tracker.add_transaction(
+                ca=ca,
+                sol_amount=sol_amount,
+                tx_description=tx_description,
+                channel_name=channel_name,
+                wallet_type=wallet_type,
+                token_name=token_name,
+                seen_at=seen_at
+            )
+
+        self.state_store.mark(ca)
+        #print(f"Found new token:")
+        #print(f"- Name: {token_name}")
+        #print(f"- Contract: {ca:.20}...")
+        #print(f"- Channel: {channel_name}")
+
+        totals = self.ca_buy_totals.get(ca)
+        if totals is None:
+            totals = self.ca_buy_totals[ca] = CaBuyTotals()
+        if totals.add(tx_description, channel_name, swap):
+            print(f"- Added new transaction description")
+
+        await self.check_for_multialert(session, token_name, ca)
+
+    async def degen_fetch_messages(self, discord, channel_id, channel_name):
+        processed_messages = BoundedDedup(snowflake=True)
         #print(f"\nStarting to monitor channel: {channel_name}")
 
         while True:
             try:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        messages = await response.json()
-                        if messages:
-                            latest_message = messages[0]
-                            message_id = latest_message['id']
-                            if message_id not in processed_messages:
-                                processed_messages.add(message_id)
-                                print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] New message in {channel_name}")
-                                await self.degen_process_messages(session, latest_message, ca_set, channel_name)
-                    else:
-                        print(f"[ERROR] Failed to fetch messages from {channel_name}: Status {response.status}")
+                status, messages = await discord.fetch_new_messages(channel_id, self.last_message_ids)
+                if status == 200:
+                    for message in messages:
+                        message_id = message['id']
+                        if message_id not in processed_messages:
+                            processed_messages.add(message_id)
+                            print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] New message in {channel_name}")
+                            await self.enqueue_message(discord.session, message, channel_name, self.degen_process_messages)
+                else:
+                    print(f"[ERROR] Failed to fetch messages from {channel_name}: Status {status}")
                 await asyncio.sleep(5)
             except Exception as e:
                 print(f"[ERROR] Exception in {channel_name} channel: {str(e)}")
                 await asyncio.sleep(5)
 
 
-    async def degen_process_messages(self, session, message, ca_set, channel_name):
+    async def degen_process_messages(self, session, message, channel_name):
         try:
-            embeds = message.get('embeds', [])
-            if not embeds:
+            parsed = embed_parser.parse(message, 'swt')
+            if parsed is None:
                 print(f"[{channel_name}] No embeds found in message")
                 return
 
-            embed = embeds[0]
             #print(f"\n=== Processing Message from {channel_name} ===")
 
-            fields = embed.get('fields', [])
-            for field in fields:
-                token_name = field.get('name', '').strip().lower()
-                if token_name not in {'sol', 'useful links', 'buy with bonkbot', 'token address'}:
-                    ca = field.get('value', '')
-                    if ca and ca not in {'So11111111111111111111111111111111111111112', '[Wallet]', '[Neo]'}:
-                        ca_set.add(ca)
-                        """
-                        if ca not in self.ca_to_tx_descriptions:
-                            self.ca_to_tx_descriptions[ca] = []
-                            if (tx_description, channel_name) not in self.ca_to_tx_descriptions[ca]:
-                                self.ca_to_tx_descriptions[ca].append((tx_description, channel_name)
-                        """
-                        #print(f"Found new token:")
-                        #print(f"- Name: {token_name}")
-                        #print(f"- Contract: {ca[:20]}...")
-                        #print(f"- Channel: {channel_name}")
-
-                        await self.check_for_multialert(session, token_name, ca)
-                        return
+            ca = parsed.get('ca')
+            if ca:
+                self.category_index.add(ca, channel_name, snowflake_time(message['id']))
+                self.state_store.mark(ca)
+                #print(f"Found new token:")
+                #print(f"- Name: {parsed['token_name']}")
+                #print(f"- Contract: {ca:.20}...")
+                #print(f"- Channel: {channel_name}")
+
+                await self.check_for_multialert(session, parsed['token_name'], ca)
 
             #print("=== Message Processing Complete ===\n")
 
         except Exception as e:
             print(f"[ERROR] Error Processing SWT Messages: {str(e)}")
 
-    async def fresh_channel_fetch_messages(self, session, channel_id, ca_set, channel_name):
-            headers = {'authorization': TOKEN}
-
-            processed_messages = set()
-            url = self.url.format(channel_id)
+    async def fresh_channel_fetch_messages(self, discord, channel_id, channel_name):
+            processed_messages = BoundedDedup(snowflake=True)
             #print(f"\nStarting to monitor channel: {channel_name}")
 
             while True:
                 try:
-                    async with session.get(url, headers=headers) as response:
-                        if response.status == 200:
-                            messages = await response.json()
-                            if messages:
-                                latest_message = messages[0]
-                                message_id = latest_message['id']
-                                if message_id not in processed_messages:
-                                    processed_messages.add(message_id)
-                                    #print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] New message in {channel_name}")
-                                    await self.fresh_channels_process_messages(session, latest_message, ca_set, channel_name)
-                        else:
-                            print(f"[ERROR] Failed to fetch messages from {channel_name}: Status {response.status}")
+                    status, messages = await discord.fetch_new_messages(channel_id, self.last_message_ids)
+                    if status == 200:
+                        for message in messages:
+                            message_id = message['id']
+                            if message_id not in processed_messages:
+                                processed_messages.add(message_id)
+                                #print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] New message in {channel_name}")
+                                await self.enqueue_message(discord.session, message, channel_name, self.fresh_channels_process_messages)
+                    else:
+                        print(f"[ERROR] Failed to fetch messages from {channel_name}: Status {status}")
                     await asyncio.sleep(5)
                 except Exception as e:
                     print(f"[ERROR] Exception in {channel_name} channel: {str(e)}")
                     await asyncio.sleep(5)
 
-    async def fresh_channels_process_messages(self, session, message, ca_set, channel_name):
+    async def fresh_channels_process_messages(self, session, message, channel_name):
             try:
-                embeds = message.get('embeds', [])
-                if not embeds:
+                parsed = embed_parser.parse(message, 'fresh')
+                if parsed is None:
                     print(f"[{channel_name}] No embeds found in message")
                     return
 
-                embed = embeds[0]
-                tx_description = embed.get('description', '')
-                
+                tx_description = parsed['description']
                 if not tx_description:
                     print(f"[{channel_name}] No transaction description found")
                     return
                 
                 # Get token name from title and handle the '$' prefix
-                token_name = embed.get('title', '').strip()
+                token_name = parsed['title'].strip()
                 if token_name.startswith('$'):
                     token_name = token_name[1:]  # Remove the '$' prefix if present
                 
-                
                 if not token_name:
                     print(f"[WARNING] No title found in embed for channel {channel_name}")
                     return
-                    
-                description_lower = tx_description.lower()
-                
-                
-                
+
                 # Check if this is a swap transaction
-                if "swapped" not in description_lower:
+                if "swapped" not in tx_description.lower():
                     return
 
-               
-
                 #print(f"\n=== Processing Message from {channel_name} ===")
                 print(f"Transaction Description: {tx_description[:100]}...")
 
-                fields = embed.get('fields', [])
-                for field in fields:
-                    field_name = field.get('name', '').strip().lower()
-                    if field_name == "token address:":
-                        ca = field.get('value', '').strip()
-                        if ca and ca not in {'So11111111111111111111111111111111111111112', '[Wallet]', '[Neo]'}:
-                            if "swapped" and "SOL for" in tx_description:
-                                await self.tracker.process_buy_transaction(ca, token_name, tx_description)
-                            elif "for" and "SOL on" in tx_description:
-                                await self.tracker.process_sell_transaction(ca, token_name, tx_description)
-
-                            sol_amount = self.extract_sol_buy_amount(tx_description)
-                            if sol_amount > 0:
-                                wallet_type = 'fresh' if 'fresh' in channel_name.lower() else 'swt'
-                                
-                                if sol_amount >= 5.0:
-                                    await self.sol_tracker.add_transaction(
-                                        ca=ca,
-                                        sol_amount=sol_amount,
-                                        tx_description=tx_description,
-                                        channel_name=channel_name,
-                                        wallet_type=wallet_type,
-                                        token_name=token_name
-                                    )
-                            
-                            ca_set.add(ca)
-                            #print(f"Found new token:")
-                            #print(f"- Contract: {ca[:20]}...")
-                            #print(f"- Name: {token_name}")
-                            #print(f"- Channel: {channel_name}")
-                            
-                            if ca not in self.ca_to_tx_descriptions:
-                                self.ca_to_tx_descriptions[ca] = []
-                            if (tx_description, channel_name) not in self.ca_to_tx_descriptions[ca]:
-                                self.ca_to_tx_descriptions[ca].append((tx_description, channel_name))
-                                #print(f"- Added new transaction description")
-
-                            # Fetch additional token data
-                            await self.check_for_multialert(session, token_name, ca)
-                            #fresh_token_name = self.dex.token_name
-                            #print(fresh_token_name)
-                            return
+                ca = parsed.get('ca')
+                if ca:
+                    await self.record_swap(session, ca, token_name, tx_description, parsed['swap'], channel_name,
+                                           snowflake_time(message['id']))
 
                 #print("=== Message Processing Complete ===\n")
 
@@ -447,39 +387,47 @@ class AlefDaoScraper:
         """Monitor individual token's market cap with improved error handling and retry logic"""
         retries = 0
         max_retries = 3
+        stop_at = time.time() + self.monitor_duration
         
-        while True:
-            try:
-                await self.dex.fetch_token_data_from_dex(session, ca)
-                current_mc = self.dex.token_mc
+        try:
+            while time.time() < stop_at:
+                try:
+                    snapshot = await dex_client.snapshot(ca, batched=True, priority='background')
+                    current_mc = snapshot.market_cap if snapshot else None
                 
-                if current_mc is None or current_mc == 0:
-                    retries += 1
-                    if retries >= max_retries:
-                        print(f"Stopping monitoring for {ca} - No valid market cap data")
-                        return
-                    await asyncio.sleep(5)
-                    continue
+                    if current_mc is None or current_mc == 0:
+                        retries += 1
+                        if retries >= max_retries:
+                            print(f"Stopping monitoring for {ca} - No valid market cap data")
+                            return
+                        await asyncio.sleep(5)
+                        continue
 
-                if ca not in self.original_mcs:
-                    self.original_mcs[ca] = current_mc
-                    #print(f"Started monitoring {token_name} at ${current_mc:,.2f}")
-                else:
-                    original_mc = self.original_mcs[ca]
-                    if original_mc > 0:
-                        increase_percentage = ((current_mc - original_mc) / original_mc) * 100
-                        if increase_percentage >= 100:
+                    if ca not in self.original_mcs:
+                        self.original_mcs[ca] = current_mc
+                        #print(f"Started monitoring {token_name} at ${current_mc:,.2f}")
+                    else:
+                        original_mc = self.original_mcs[ca]
+                        if original_mc > 0:
+                            increase_percentage = ((current_mc - original_mc) / original_mc) * 100
+                            if increase_percentage >= 100:
 
-                            await self.send_marketcap_increase_webhook(
-                                ca, increase_percentage, original_mc, current_mc, token_name
-                            )
-                            self.original_mcs[ca] = current_mc  # Update baseline
+                                await self.send_marketcap_increase_webhook(
+                                    ca, increase_percentage, original_mc, current_mc, token_name
+                                )
+                                self.original_mcs[ca] = current_mc  # Update baseline
 
-                await asyncio.sleep(50)  # Check every 50 seconds
+                    await asyncio.sleep(50)  # Check every 50 seconds
                 
-            except Exception as e:
-                print(f"Error monitoring market cap for {ca}: {e}")
-                await asyncio.sleep(5)  # Backoff on error
+                except Exception as e:
+                    print(f"Error monitoring market cap for {ca}: {e}")
+                    await asyncio.sleep(5)  # Backoff on error
+        finally:
+            self.monitoring_tasks.pop(ca, None)
+            self.original_mcs.pop(ca, None)
+            if ca not in self.category_index:
+                self.multi_alerted_cas.discard(ca)
+                self.state_store.mark(ca)
 
 
     async def send_marketcap_increase_webhook(self, ca, increase_percentage, original_mc, new_mc, token_name):
@@ -527,105 +475,20 @@ class AlefDaoScraper:
             print(f"Error sending 2x webhook: {e}")
 
 
-    def extract_sol_buy_amount(self, tx_description: str) -> float:
-        """Extract SOL buy amount from transaction description"""
-        parts = tx_description.lower().split()
-        
-        try:
-            for i, word in enumerate(parts):
-                if word == "swapped":
-                    next_word = parts[i + 1]
-                    try:
-                        if next_word.replace(".", "").isdigit() and parts[i + 2] == "sol":
-                            return float(next_word)
-                    except ValueError:
-                        continue
-        except IndexError:
-            return 0
-        
-        return 0
-
-    def aggregate_sol_buys(self, tx_descriptions: list) -> dict:
-        """Aggregate total SOL buys by wallet category using channel names"""
-        buys = {
-            "Legend Alpha": 0,    # Changed from "Legend" to match channel name
-            "Kol Alpha": 0,
-            "Kol Regular": 0,
-            "Whale": 0,
-            "Smart": 0,
-            "Challenge": 0,
-            "High Freq": 0,
-            "Degen": 0,
-            "Fresh": 0,
-            "Fresh 5sol 1m MC": 0,  # Changed to match the channel name
-            "Fresh 1h": 0,
-            "Insider": 0          # Added for insider wallet tracking
-        }
-
-        seen_fresh_txs = set()
-        
-        for tx_description, channel_name in tx_descriptions:
-            sol_amount = self.extract_sol_buy_amount(tx_description)
-            if sol_amount > 0:
-                # Map channel_name to the appropriate category
-                if channel_name == 'Fresh' or 'freshly funded wallet' in tx_description.lower():
-                    if tx_description in seen_fresh_txs:
-                        continue
-                    seen_fresh_txs.add(tx_description)
-                    buys['Fresh'] += sol_amount
-                elif channel_name == 'Fresh 5sol 1m MC':  # Updated to match channel name
-                    buys['Fresh 5sol 1m MC'] += sol_amount
-                elif channel_name == 'Fresh 1h':
-                    buys['Fresh 1h'] += sol_amount
-                elif channel_name == 'Legend Alpha':  # Updated to match channel name
-                    buys['Legend Alpha'] += sol_amount
-                elif channel_name == 'Kol Alpha':
-                    buys['Kol Alpha'] += sol_amount
-                elif channel_name == 'Kol Regular':
-                    buys['Kol Regular'] += sol_amount
-                elif channel_name == 'Whale':
-                    buys['Whale'] += sol_amount
-                elif channel_name == 'Smart':
-                    buys['Smart'] += sol_amount
-                elif channel_name == 'Challenge':
-                    buys['Challenge'] += sol_amount
-                elif channel_name == 'High Freq':
-                    buys['High Freq'] += sol_amount
-                elif channel_name == 'Insider':
-                    buys['Insider'] += sol_amount
-                elif channel_name == 'Degen':
-                    buys['Degen'] += sol_amount
-        return buys
-
-
     async def check_for_multialert(self, session, token_name, ca):
         """Check if token has been bought by both fresh and SOL tracker wallets"""
         if ca in self.multi_alerted_cas:
             print(f"Token {token_name} already alerted for multi-ape, skipping... ")
             return
 
-        fresh_ca_tracker_sets = {
-            'Fresh': self.fresh_cas,
-            'Fresh 1h': self.fresh_1h_cas,
-            'Fresh 5sol 1m MC': self.fresh_5sol_1m_mc_cas
-        }
-
-        sol_tracker_sets = {
-            'Legend Alpha': self.legend_cas,
-            'Kol Alpha': self.kol_alpha_cas,
-            'Kol Regular': self.kol_regular_cas,
-            'Whale': self.whale_cas,
-            'Smart': self.smart_cas,
-            'Challenge': self.challenge_cas,
-            'High Freq': self.high_freq_cas,
-            'Degen': self.degen_cas,
-            'Insider': self.insider_wallet_cas
-        }
-
-        fresh_wallet_name = next((name for name, ca_set in fresh_ca_tracker_sets.items() if ca in ca_set), None)
-        sol_wallet_names = [name for name, ca_set in sol_tracker_sets.items() if ca in ca_set]
-
-        if fresh_wallet_name and sol_wallet_names:
+        fired = alert_rules.evaluate('multi_alert', ca, {'categories': self.category_index.seen(ca)}, ('categories',))
+        if fired:
+            mask = 0
+            for _, matched in fired:
+                mask |= matched
+            fresh_wallet_names = category_names(mask & FRESH_MASK)
+            fresh_wallet_name = fresh_wallet_names[0] if fresh_wallet_names else 'no Fresh wallets'
+            sol_wallet_names = category_names(mask & SWT_MASK)
             self.multi_alerted_cas.add(ca)
             alert_time = datetime.now().strftime('%I:%M:%S %p')
             
@@ -633,28 +496,27 @@ class AlefDaoScraper:
                 #revival_monitor = TokenRevivalMonitor()
                 #await revival_monitor.start_revival_monitoring(session, ca, token_name)
 
-                await self.dex.fetch_token_data_from_dex(session, ca)
-                initial_volume = self.dex.token_5m_vol
-
-
+                dex = await dex_client.snapshot(ca) or TokenSnapshot.unknown(ca)
 
                 await self.start_market_cap_monitoring(session, ca, token_name)
                 
-                combined_description = "\n".join([desc for desc, _ in self.ca_to_tx_descriptions.get(ca, [])])
-                sol_buys = self.aggregate_sol_buys(self.ca_to_tx_descriptions.get(ca, []))
+                totals = self.ca_buy_totals.get(ca) or CaBuyTotals()
+                transactions = totals.items()
+                combined_description = "\n".join([desc for desc, _ in transactions])
+                sol_buys = dict(totals.sol_buys)
 
                 print("\nMASOL Buy Amounts:")
                 for wallet_type, amount in sol_buys.items():
                     if amount > 0:
                         print(f"{wallet_type}: {amount:.2f} SOL")
                 print("\nChannel Names and Transactions:")
-                for desc, channel in self.ca_to_tx_descriptions.get(ca, []):
+                for desc, channel in transactions:
                     print(f"{channel}: {desc}")
 
                 sol_wallets_str = ', '.join(sol_wallet_names)
                 
-                market_cap_display = "${:,.2f}".format(self.dex.token_mc) if self.dex.token_mc else "Unknown"
-                volume_display = "${:,.2f}".format(self.dex.token_5m_vol) if self.dex.token_5m_vol else "Unknown"
+                market_cap_display = "${:,.2f}".format(dex.market_cap) if dex.market_cap else "Unknown"
+                volume_display = "${:,.2f}".format(dex.volume_5m) if dex.volume_5m else "Unknown"
                 
                 print(
                     f"{"-" * 15}\n"
@@ -663,16 +525,16 @@ class AlefDaoScraper:
                     f"CA: {ca}\n"
                     f"Market Cap: {market_cap_display}\n"
                     f"5m Volume: {volume_display}\n"
-                    f"1h Volume: {self.dex.token_1h_vol}\n"
-                    f"6h Volume: {self.dex.token_6h_vol}\n"
-                    f"24h Volume: {self.dex.token_24h_vol}\n"
-                    f"5m buys: {self.dex.token_5m_buys}\n"
-                    f"5m sells: {self.dex.token_5m_sells}"
-                    f"Liquidity: {self.dex.token_liquidity}\n"
+                    f"1h Volume: {dex.volume_1h}\n"
+                    f"6h Volume: {dex.volume_6h}\n"
+                    f"24h Volume: {dex.volume_24h}\n"
+                    f"5m buys: {dex.buys_5m}\n"
+                    f"5m sells: {dex.sells_5m}"
+                    f"Liquidity: {dex.liquidity}\n"
                     f"Categories: {sol_wallets_str} and {fresh_wallet_name}\n"
-                    f"TG: {self.dex.tg_link or 'No TG Link'}\n"
-                    f"X: {self.dex.x_link or 'No X Link'}\n"
-                    f"DEX: {self.dex.token_dex_url or 'No DEX URL'}\n"
+                    f"TG: {dex.tg_link or 'No TG Link'}\n"
+                    f"X: {dex.x_link or 'No X Link'}\n"
+                    f"DEX: {dex.dex_url or 'No DEX URL'}\n"
                     f"{"-" * 15}\n"
                 )
 
@@ -682,13 +544,13 @@ class AlefDaoScraper:
                     description=f"{token_name} was detected in multiple wallets at {alert_time}! ",
                     display_message=f"Aped by wallets in categories: {sol_wallets_str} and {fresh_wallet_name}",
                     token_name=token_name,
-                    marketcap=self.dex.token_mc,
-                    m5_vol=self.dex.token_5m_vol,
-                    liquidity=self.dex.token_liquidity,
-                    tg_link=self.dex.tg_link or "No TG Found",
-                    x_link=self.dex.x_link or "No Twitter Link Found",
+                    marketcap=dex.market_cap,
+                    m5_vol=dex.volume_5m,
+                    liquidity=dex.liquidity,
+                    tg_link=dex.tg_link or "No TG Found",
+                    x_link=dex.x_link or "No Twitter Link Found",
                     tx_description=combined_description,
-                    token_dex_url=self.dex.token_dex_url,
+                    token_dex_url=dex.dex_url,
                     sol_buys=sol_buys
                 )
 
@@ -711,7 +573,7 @@ class AlefDaoScraper:
                     "fields": [
                         {
                             "name": "CA",
-                            "value": f"`{ca.strip()}`",
+                            "value": f"`{ca}`",
                             "inline": False
                         },
                         {
@@ -779,6 +641,49 @@ class AlefDaoScraper:
             print(f"Error sending multi-alert webhook: {e}")
 
 
+class SolTrade:
+    """One 5+ SOL buy kept by SolAmountTracker. `timestamp` is unix time"""
+    __slots__ = ('amount', 'channel', 'wallet_type', 'timestamp', 'description_id')
+
+    def __init__(self, amount, channel, wallet_type, timestamp, description_id):
+        self.amount = amount
+        self.channel = channel
+        self.wallet_type = wallet_type
+        self.timestamp = timestamp
+        self.description_id = description_id
+
+
+class CaSolBuys:
+    """A CA's large buys plus the running maxima the alert rules read.
+
+    `largest` is the biggest buy, `best_by_channel` the biggest per channel and
+    `top_two` the two biggest from different channels (largest first). Adding a
+    trade updates all three in constant time, so alert checks never rescan
+    `trades`.
+    """
+    __slots__ = ('trades', 'largest', 'best_by_channel', 'top_two')
+
+    def __init__(self):
+        self.trades = []
+        self.largest = None
+        self.best_by_channel = {}
+        self.top_two = []
+
+    def add(self, trade):
+        self.trades.append(trade)
+        if self.largest is None or trade.amount > self.largest.amount:
+            self.largest = trade
+
+        best = self.best_by_channel.get(trade.channel)
+        if best is None or trade.amount > best.amount:
+            self.best_by_channel[trade.channel] = trade
+            # Only this channel's best changed, so the new top two come from the old pair plus this trade
+            top = [other for other in self.top_two if other.channel != trade.channel]
+            top.append(trade)
+            top.sort(key=lambda other: other.amount, reverse=True)
+            self.top_two = top[:2]
+
+
 class SolAmountTracker:
     def __init__(self):
         self.ca_data = {}
@@ -788,45 +693,59 @@ class SolAmountTracker:
 
     async def initialize_ca_tracking(self, ca, token_name=None):
         if ca not in self.ca_data:
-            self.ca_data[ca] = {
-                'large_buys': [],
-                'transactions': []
-            }
+            self.ca_data[ca] = CaSolBuys()
             if token_name:
                 self.token_names[ca] = token_name
-            
-    async def add_transaction(self, ca, sol_amount, tx_description, channel_name, wallet_type, token_name=None):
+
+    async def add_transaction(self, ca, sol_amount, tx_description, channel_name, wallet_type, token_name=None, seen_at=None):
         """Add a new transaction and update cumulative amounts"""
         print(f"Processing transaction: {sol_amount} SOL from {channel_name} for {ca}")
         try:
             # First initialize tracking for this CA
             await self.initialize_ca_tracking(ca, token_name)
-            
-            # Add transaction and update amounts under lock protection
-            transaction = {
-                'amount': sol_amount,
-                'description': tx_description,
-                'channel': channel_name,
-                'wallet_type': wallet_type,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            if ca not in self.ca_data:
-                return  # Safety check in case CA was removed
-                
-            self.ca_data[ca]['transactions'].append(transaction)
-            
-            # Update the appropriate amount counter
-            if sol_amount >= 5.0:
-                self.ca_data[ca]['large_buys'].append(transaction)
-        
-        # Check threshold after releasing lock to prevent deadlocks
+
+            self.ca_data[ca].add(SolTrade(
+                sol_amount, channel_name, wallet_type, seen_at or time.time(), descriptions.add(tx_description)
+            ))
             await self.check_alert_conditions(ca)
             
         except Exception as e:
             print(f"Error adding transaction for {ca}: {e}")
             raise e  # Re-raise to allow proper error handling upstream
         
+    def export_ca(self, ca):
+        data = self.ca_data.get(ca)
+        alerted = ca in self.sol_alerted_cas
+        if data is None and not alerted:
+            return None
+        return {
+            'trades': [
+                (trade.amount, trade.channel, trade.wallet_type, trade.timestamp, descriptions.get(trade.description_id))
+                for trade in data.trades
+            ] if data else [],
+            'token_name': self.token_names.get(ca),
+            'alerted': alerted
+        }
+
+    def import_ca(self, ca, state):
+        if state['alerted']:
+            self.sol_alerted_cas.add(ca)
+        if state['token_name']:
+            self.token_names[ca] = state['token_name']
+        if state['trades']:
+            data = self.ca_data[ca] = CaSolBuys()
+            for amount, channel, wallet_type, timestamp, tx_description in state['trades']:
+                data.add(SolTrade(amount, channel, wallet_type, timestamp, descriptions.add(tx_description)))
+
+    def forget(self, ca):
+        """Drop a CA's transactions and alert flag, releasing their descriptions"""
+        data = self.ca_data.pop(ca, None)
+        if data:
+            for trade in data.trades:
+                descriptions.release(trade.description_id)
+        self.token_names.pop(ca, None)
+        self.sol_alerted_cas.discard(ca)
+
     async def check_alert_conditions(self, ca):
         if ca in self.sol_alerted_cas:
             return
@@ -836,34 +755,9 @@ class SolAmountTracker:
             if ca not in self.ca_data:
                 return
 
-            data = self.ca_data[ca]
-            transactions = [tx for tx in data['transactions'] if tx['channel'].lower() != 'degen']
-            
-            alerts_to_send = []
-            
-            # Check for 10+ SOL buys first
-            large_single_buys = [tx for tx in transactions if tx['amount'] >= 10.0]
-            if large_single_buys:
-                largest_buy = max(large_single_buys, key=lambda x: x['amount'])
-                print(f"Found 10+ SOL buy: {largest_buy['amount']} from {largest_buy['channel']}")
-                alerts_to_send.append(('One 10+ sol buy', [largest_buy]))
-            
-            # Check for 5+ SOL buys from different channels
-            five_plus_buys = [(tx['channel'], tx) for tx in transactions if tx['amount'] >= 5.0]
-            channels_with_large_buys = {}
-            
-            for channel, tx in five_plus_buys:
-                # Keep largest buy per channel
-                if channel not in channels_with_large_buys or tx['amount'] > channels_with_large_buys[channel]['amount']:
-                    channels_with_large_buys[channel] = tx
-            
-            if len(channels_with_large_buys) >= 2:
-                # Take the two largest buys from different channels
-                different_channel_buys = sorted(channels_with_large_buys.values(), 
-                                            key=lambda x: x['amount'], 
-                                            reverse=True)[:2]
-                print(f"Found 5+ SOL buys from different channels: {[tx['channel'] for tx in different_channel_buys]}")
-                alerts_to_send.append(('Two 5+ sol buys', different_channel_buys))
+            alerts_to_send = alert_rules.evaluate('sol_amount', ca, self.ca_data[ca], ('trades',))
+            for alert_type, trades in alerts_to_send:
+                print(f"Found {alert_type}: {[(trade.amount, trade.channel) for trade in trades]}")
 
             if alerts_to_send:
                 self.sol_alerted_cas.add(ca)
@@ -878,17 +772,15 @@ class SolAmountTracker:
             
     async def send_alert(self, ca, alert_type, triggering_transactions):
         try:
-            dex = DexScreenerAPI()
-            async with aiohttp.ClientSession() as session:
-                await dex.fetch_token_data_from_dex(session, ca)            
+            dex = await dex_client.snapshot(ca) or TokenSnapshot.unknown(ca)
             if ca not in self.ca_data:
                 return
 
             token_name = self.token_names.get(ca, "Unknown Token")
-            all_transactions = self.ca_data[ca]['transactions']
+            all_transactions = self.ca_data[ca].trades
 
             tx_summary = "\n".join([
-                f"• {tx['amount']:.2f} SOL - {tx['channel']} - {tx['timestamp']}"
+                f"• {tx.amount:.2f} SOL - {tx.channel} - {datetime.fromtimestamp(tx.timestamp).strftime('%Y-%m-%d %H:%M:%S')}"
                 for tx in all_transactions
             ])
 
@@ -897,14 +789,14 @@ class SolAmountTracker:
                 description = (
                     f"Token: `{token_name}`\n"
                     f"Two or more wallets have made 5+ SOL purchases!\n"
-                    f"First Transaction: {triggering_transactions[0]['amount']:.2f} SOL from {triggering_transactions[0]['channel']}\n"
-                    f"Second Transaction: {triggering_transactions[1]['amount']:.2f} SOL from {triggering_transactions[1]['channel']}"
+                    f"First Transaction: {triggering_transactions[0].amount:.2f} SOL from {triggering_transactions[0].channel}\n"
+                    f"Second Transaction: {triggering_transactions[1].amount:.2f} SOL from {triggering_transactions[1].channel}"
                 )
             else:  # single large buy
                 title = "🚨 10+ SOL Buy Detected! 🚨"
                 description = (
                     f"Token: `{token_name}`\n"
-                    f"Transaction: {triggering_transactions[0]['amount']:.2f} SOL detected from {triggering_transactions[0]['channel']}!"
+                    f"Transaction: {triggering_transactions[0].amount:.2f} SOL detected from {triggering_transactions[0].channel}!"
                 )
 
             data = {
@@ -920,17 +812,17 @@ class SolAmountTracker:
                         },
                         {
                             "name": "Market Cap",
-                            "value": f"${dex.token_mc:,.2f}" if dex.token_mc else "Unknown",
+                            "value": f"${dex.market_cap:,.2f}" if dex.market_cap else "Unknown",
                             "inline": True
                         },
                         {
                             "name": "Liquidity",
-                            "value": f"${dex.token_liquidity:,.2f}" if dex.token_liquidity else "Unknown",
+                            "value": f"${dex.liquidity:,.2f}" if dex.liquidity else "Unknown",
                             "inline": True
                         },
                         {
                             "name": "5m Volume 📊",
-                            "value": f"${dex.token_5m_vol:,.2f}" if dex.token_5m_vol else "Unknown",
+                            "value": f"${dex.volume_5m:,.2f}" if dex.volume_5m else "Unknown",
                             "inline": True
                         },
                         {
@@ -940,7 +832,7 @@ class SolAmountTracker:
                         },
                         {
                             "name": "Links",
-                            "value": f"📈 [DEX]({dex.token_dex_url})\n💬 [Telegram]({dex.tg_link})\n🐦 [Twitter]({dex.x_link})",
+                            "value": f"📈 [DEX]({dex.dex_url})\n💬 [Telegram]({dex.tg_link})\n🐦 [Twitter]({dex.x_link})",
                             "inline": False
                         }
                     ],
@@ -968,36 +860,103 @@ class SolAmountTracker:
 
 
 class Main:
-    def __init__(self):
+    def __init__(self, ingestion_mode=INGESTION_MODE):
         self.scraper = AlefDaoScraper()
         self.ma_scraper = ADScraper()
+        self.ingestion_mode = ingestion_mode
+        create_tables.create_tables()
+        # Restored once here: run_bot restarts itself on errors and must keep the live state
+        self.scraper.state_store.restore()
         #print("\n=== Discord Multi Tracking Bot ===")
         #print("Initializing...")
 
+    def channels(self):
+        """(poller, processor, channel_id, channel_name) for every watched channel"""
+        swt = (self.scraper.swt_fetch_messages, self.scraper.swt_process_messages)
+        fresh = (self.scraper.fresh_channel_fetch_messages, self.scraper.fresh_channels_process_messages)
+        return [
+            # All channel names now match exactly with the buys dictionary
+            (*swt, '1279040666101485630', 'Legend Alpha'),
+            (*swt, '1280445495482781706', 'Kol Alpha'),
+            (*swt, '1273245344263569484', 'Kol Regular'),
+            (*swt, '1273250694257705070', 'Whale'),
+            (*swt, '1280465862163304468', 'Smart'),
+            (*swt, '1277231510574862366', 'Insider'),
+            (*swt, '1283348335863922720', 'Challenge'),
+            (*swt, '1273670414098501725', 'High Freq'),
+            #(self.scraper.degen_fetch_messages, self.scraper.degen_process_messages, '1278278627997384704', 'Degen'),
+
+            (*fresh, '1281675800260640881', 'Fresh'),
+            (*fresh, '1281677424005746698', 'Fresh 1h'),
+            (*fresh, '1281676746202026004', 'Fresh 5sol 1m MC'),
+
+            #self.ma_scraper.fetch_ma_messages(discord, '1298438610663768154', 'Multi-Alert Channel')
+        ]
+
+    async def backfill(self, discord):
+        """Replay messages posted while the bot was down before live ingestion resumes"""
+        saved = self.scraper.cursor_store.load()
+        channels = [channel for channel in self.channels() if channel[2] in saved]
+        if not channels:
+            return
+
+        results = await asyncio.gather(*[
+            discord.fetch_messages_since(channel_id, saved[channel_id])
+            for _, _, channel_id, _ in channels
+        ])
+
+        backlog = []
+        for (_, processor, channel_id, channel_name), (status, messages) in zip(channels, results):
+            if status != 200:
+                print(f"[ERROR] Backfill of {channel_name} stopped early: Status {status}")
+            for message in messages:
+                backlog.append((message, processor, channel_name))
+            # Live polling picks up from wherever the backfill got to
+            self.scraper.last_message_ids[channel_id] = messages[-1]['id'] if messages else saved[channel_id]
+
+        if not backlog:
+            return
+
+        # Replay every channel in posting order so cross-channel correlation sees events as they happened
+        backlog.sort(key=lambda item: int(item[0]['id']))
+        print(f"Backfilling {len(backlog)} messages posted while offline...")
+        for message, processor, channel_name in backlog:
+            await self.scraper.enqueue_message(discord.session, message, channel_name, processor)
+        await self.scraper.pipeline.join()
+        print("Backfill complete, resuming live ingestion")
+
     async def run_bot(self):
         #print(f"\nStarting Up Multi Tracking Bot...")
         #print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         #print("Connecting to Discord API...")
-        
-        async with aiohttp.ClientSession() as session:
-            tasks = [
-                # All channel names now match exactly with the buys dictionary
-                self.scraper.swt_fetch_messages(session, '1279040666101485630', self.scraper.legend_cas, 'Legend Alpha'),
-                self.scraper.swt_fetch_messages(session, '1280445495482781706', self.scraper.kol_alpha_cas, 'Kol Alpha'),
-                self.scraper.swt_fetch_messages(session, '1273245344263569484', self.scraper.kol_regular_cas, 'Kol Regular'),
-                self.scraper.swt_fetch_messages(session, '1273250694257705070', self.scraper.whale_cas, 'Whale'),
-                self.scraper.swt_fetch_messages(session, '1280465862163304468', self.scraper.smart_cas, 'Smart'),
-                self.scraper.swt_fetch_messages(session, '1277231510574862366', self.scraper.insider_wallet_cas, 'Insider'),
-                self.scraper.swt_fetch_messages(session, '1283348335863922720', self.scraper.challenge_cas, 'Challenge'),
-                self.scraper.swt_fetch_messages(session, '1273670414098501725', self.scraper.high_freq_cas, 'High Freq'),
-                #self.scraper.degen_fetch_messages(session, '1278278627997384704', self.scraper.degen_cas, 'Degen'),
-
-                self.scraper.fresh_channel_fetch_messages(session, '1281675800260640881', self.scraper.fresh_cas, 'Fresh'),
-                self.scraper.fresh_channel_fetch_messages(session, '1281677424005746698', self.scraper.fresh_1h_cas, 'Fresh 1h'),
-                self.scraper.fresh_channel_fetch_messages(session, '1281676746202026004', self.scraper.fresh_5sol_1m_mc_cas, 'Fresh 5sol 1m MC')
-
-                #self.ma_scraper.fetch_ma_messages(session, '1298438610663768154', 'Multi-Alert Channel')
-            ]
+
+        async with DiscordClient() as discord:
+            self.scraper.pipeline.start()
+            try:
+                await self.backfill(discord)
+            except Exception as e:
+                print(f"[ERROR] Backfill failed, continuing with live ingestion: {str(e)}")
+
+            if self.ingestion_mode == 'gateway':
+                handlers = {
+                    channel_id: (self.scraper.enqueue_message, (channel_name, processor))
+                    for _, processor, channel_id, channel_name in self.channels()
+                }
+                gateway = GatewayClient(discord.session, handlers, cursors=self.scraper.last_message_ids)
+                tasks = [gateway.run()]
+            else:
+                tasks = [
+                    poller(discord, channel_id, channel_name)
+                    for poller, _, channel_id, channel_name in self.channels()
+                ]
+            tasks.append(self.scraper.pipeline.log_metrics())
+            tasks.append(descriptions.log_metrics())
+            tasks.append(alert_rules.log_metrics())
+            tasks.append(dex_client.log_metrics())
+            tasks.append(market_data_limiter.log_metrics())
+            tasks.append(alert_coalescer.log_metrics())
+            tasks.append(self.scraper.cursor_store.flush_periodically())
+            tasks.append(self.scraper.state_store.flush_periodically())
 
             try:
                 #print("All monitoring tasks started successfully!")
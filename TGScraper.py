@@ -1,6 +1,7 @@
 from telethon import TelegramClient
 import asyncio
 import aiohttp
+from contractaddress import parse_ca
 
 #api id and api hash
 
@@ -92,9 +93,9 @@ class BundleBot:
             print(f"Error sending full soul_scanner & bundle_bot webhook:\n{str(e)}")
             
     async def normalize(self, ca: str) -> str:
-    # Remove all whitespace and special characters
-        clean_ca = ''.join(c for c in ca if c.isalnum() or c == 'p')  # Keeps only alphanumeric + 'p' for 'pump'
-        return clean_ca.lower()
+        # Base58 is case sensitive, so only strip formatting - never change case
+        parsed = parse_ca(ca)
+        return str(parsed) if parsed else ca.strip().strip('`')
 
     async def send_conditional_webhook(self, ca: str):
         try:
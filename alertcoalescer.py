@@ -0,0 +1,182 @@
+import asyncio
+import os
+import time
+import aiohttp
+from collections import OrderedDict
+
+
+ALERT_DEBOUNCE_SECONDS = float(os.getenv('ALERT_DEBOUNCE_SECONDS', 10))
+ALERT_LIVE_MINUTES = float(os.getenv('ALERT_LIVE_MINUTES', 30))
+
+
+# Outcomes of editing a live message
+EDIT_APPLIED = 'applied'
+EDIT_GONE = 'gone'      # The message was deleted, so post a new one
+EDIT_RETRY = 'retry'    # Rate limited, server or network error: try the edit again later
+MAX_EDIT_RETRIES = 3
+
+
+class LiveAlert:
+    __slots__ = ('message_id', 'posted_at', 'updated_at', 'build', 'flush_task', 'posting', 'retries')
+
+    def __init__(self, posted_at):
+        self.message_id = None
+        self.posted_at = posted_at
+        self.updated_at = posted_at
+        self.build = None        # latest payload builder waiting to be applied
+        self.flush_task = None
+        self.posting = True      # first post still waiting for its message id
+        self.retries = 0
+
+
+class AlertCoalescer:
+    """Keeps one live webhook message per alert type and token.
+
+    The first alert for a key is posted with `?wait=true` so Discord returns
+    the message id. Later alerts for the same key edit that message (PATCH
+    .../messages/{id}) instead of posting another one, at most once per
+    `debounce` seconds: updates arriving in between replace the pending one,
+    and its payload is built only when the edit goes out, so it shows the
+    latest state. After `live_for` seconds the next alert starts a new message.
+
+    A failed edit is retried up to MAX_EDIT_RETRIES times, a deleted message is
+    posted again, and an update that arrives while the first post fails is
+    posted as the message instead.
+    """
+    def __init__(self, debounce=ALERT_DEBOUNCE_SECONDS, live_for=ALERT_LIVE_MINUTES * 60):
+        self.debounce = debounce
+        self.live_for = live_for
+        self.live = OrderedDict()   # (webhook_url, key) -> LiveAlert, oldest post first
+
+        self.posts = 0
+        self.edits = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.dropped = 0
+
+    def expire(self, now):
+        while self.live:
+            live_key, live = next(iter(self.live.items()))
+            if now - live.posted_at < self.live_for or live.flush_task:
+                break
+            del self.live[live_key]
+
+    async def publish(self, webhook_url, key, build):
+        """Post or update the live message for `key`. `build()` returns the webhook payload, or None to skip"""
+        now = time.monotonic()
+        self.expire(now)
+        live_key = (webhook_url, key)
+        live = self.live.get(live_key)
+
+        if live is None or now - live.posted_at >= self.live_for:
+            payload = build()
+            if payload is None:
+                return
+            live = LiveAlert(now)
+            self.live[live_key] = live
+            self.live.move_to_end(live_key)
+            live.message_id = await self.post(webhook_url, payload)
+            live.posting = False
+            if live.message_id is None and live.flush_task is None and self.live.get(live_key) is live:
+                del self.live[live_key]   # Nothing to edit, so the next alert posts again
+            return
+
+        if live.build is not None:
+            self.coalesced += 1
+        live.build = build
+        if live.flush_task is None:
+            live.flush_task = asyncio.create_task(self.flush(webhook_url, live_key, live))
+
+    async def flush(self, webhook_url, live_key, live):
+        try:
+            await asyncio.sleep(max(live.updated_at + self.debounce - time.monotonic(), 0))
+            if live.posting:
+                # Still waiting for the first post's message id, so look again in `debounce` seconds
+                live.updated_at = time.monotonic()
+                return
+            build, live.build = live.build, None
+            if build is None:
+                return
+            payload = build()
+            if payload is None:
+                return
+
+            result = EDIT_GONE if live.message_id is None else await self.edit(webhook_url, live.message_id, payload)
+            if result == EDIT_RETRY:
+                if live.retries < MAX_EDIT_RETRIES:
+                    live.retries += 1
+                    self.retries += 1
+                    if live.build is None:
+                        live.build = build   # Unless a newer update replaced it meanwhile
+                else:
+                    live.retries = 0
+                    self.dropped += 1
+                    print(f"Giving up on live alert update after {MAX_EDIT_RETRIES} retries")
+            elif result == EDIT_GONE:
+                # Never posted (the first post failed) or deleted, so this update starts a new message
+                live.retries = 0
+                live.message_id = await self.post(webhook_url, payload)
+                live.posted_at = time.monotonic()
+                if self.live.setdefault(live_key, live) is live:
+                    self.live.move_to_end(live_key)
+            else:
+                live.retries = 0
+            live.updated_at = time.monotonic()
+        except Exception as e:
+            print(f"Error updating live alert: {e}")
+        finally:
+            live.flush_task = None
+            if live.build is not None:
+                # An update is still pending (arrived during this flush, or a retry)
+                live.flush_task = asyncio.create_task(self.flush(webhook_url, live_key, live))
+
+    async def post(self, webhook_url, payload):
+        """Posts a new message and returns its id, or None when the post failed"""
+        separator = '&' if '?' in webhook_url else '?'
+        async with aiohttp.ClientSession() as session:
+            try:
+                async with session.post(f"{webhook_url}{separator}wait=true", json=payload) as response:
+                    if response.status == 200:
+                        self.posts += 1
+                        print("Webhook sent successfully")
+                        return (await response.json()).get('id')
+                    print(f"Failed to send webhook: {response.status}")
+            except Exception as e:
+                print(f"Error sending webhook: {str(e)}")
+        return None
+
+    async def edit(self, webhook_url, message_id, payload):
+        """Edits a posted message in place. Returns EDIT_APPLIED, EDIT_GONE or EDIT_RETRY"""
+        base_url = webhook_url.split('?', 1)[0]
+        async with aiohttp.ClientSession() as session:
+            try:
+                async with session.patch(f"{base_url}/messages/{message_id}", json=payload) as response:
+                    if response.status == 200:
+                        self.edits += 1
+                        print("Webhook updated successfully")
+                        return EDIT_APPLIED
+                    print(f"Failed to update webhook: {response.status}")
+                    return EDIT_GONE if response.status == 404 else EDIT_RETRY
+            except Exception as e:
+                print(f"Error updating webhook: {str(e)}")
+        return EDIT_RETRY
+
+    def metrics(self):
+        return {
+            'live_messages': len(self.live),
+            'posts': self.posts,
+            'edits': self.edits,
+            'coalesced': self.coalesced,
+            'retries': self.retries,
+            'dropped': self.dropped
+        }
+
+    async def log_metrics(self, interval=300):
+        while True:
+            await asyncio.sleep(interval)
+            m = self.metrics()
+            print(f"[ALERTS] live={m['live_messages']} posts={m['posts']} edits={m['edits']} "
+                  f"coalesced={m['coalesced']} retries={m['retries']} dropped={m['dropped']}")
+
+
+alert_coalescer = AlertCoalescer()
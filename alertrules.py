@@ -0,0 +1,217 @@
+import asyncio
+import json
+import os
+import time
+from categoryindex import CATEGORY_BITS, SWT_CATEGORIES, FRESH_CATEGORIES
+
+
+ALERT_RULES_FILE = os.getenv('ALERT_RULES_FILE')
+
+CATEGORY_GROUPS = {'swt': SWT_CATEGORIES, 'fresh': FRESH_CATEGORIES}
+
+# Rule groups -> rules, evaluated in the order listed. Each rule reads one or more
+# facts the caller passes in and is only re-checked when one of them changed:
+#   categories  {'of': categories or 'swt'/'fresh', 'min': n} groups that must all be met
+#               by the categories seen in `facts['categories']` ({bit: last seen}),
+#               optionally only counting the last `window_minutes`
+#   large_buys  `count` buys of `min_sol`+ in `facts` (the CA's CaSolBuys), optionally
+#               from distinct channels and ignoring `exclude_channels`
+#   sol_sum     `facts[field]` reached `min_sol`; fires again whenever a `watch` fact
+#               moved by the step of the highest `steps` tier [from_sol, step] reached
+DEFAULT_RULES = {
+    'multi_alert': [
+        {'name': 'Fresh and SWT wallets', 'type': 'categories',
+         'groups': [{'of': 'fresh', 'min': 1}, {'of': 'swt', 'min': 1}]},
+    ],
+    'sol_amount': [
+        {'name': 'One 10+ sol buy', 'type': 'large_buys', 'min_sol': 10,
+         'exclude_channels': ['Degen']},
+        {'name': 'Two 5+ sol buys', 'type': 'large_buys', 'min_sol': 5, 'count': 2,
+         'distinct_channels': True, 'exclude_channels': ['Degen']},
+    ],
+    'large_buys': [
+        {'name': 'Large buy volume', 'type': 'sol_sum', 'field': 'buy_amount', 'min_sol': 30,
+         'steps': [[0, 15], [500, 100]], 'watch': ['buy_amount', 'sell_amount']},
+    ],
+}
+
+
+class Rule:
+    """One compiled rule: `check(facts, last)` returns a truthy result when it fires.
+
+    `last` is the result of this rule's previous firing for the same CA, kept
+    only for `stateful` rules (None until they first fire).
+    """
+    __slots__ = ('name', 'inputs', 'check', 'stateful')
+
+    def __init__(self, name, inputs, check, stateful=False):
+        self.name = name
+        self.inputs = frozenset(inputs)
+        self.check = check
+        self.stateful = stateful
+
+
+def category_mask(categories):
+    if isinstance(categories, str):
+        categories = CATEGORY_GROUPS[categories.lower()]
+    return sum(CATEGORY_BITS[name] for name in categories)
+
+
+def compile_categories(spec):
+    groups = tuple((category_mask(group['of']), group.get('min', 1)) for group in spec['groups'])
+    window = spec['window_minutes'] * 60 if spec.get('window_minutes') else None
+
+    def check(facts, last):
+        seen = facts['categories']
+        if window:
+            cutoff = time.time() - window
+            mask = sum(bit for bit, seen_at in seen.items() if seen_at >= cutoff)
+        else:
+            mask = sum(seen)
+        for group_mask, needed in groups:
+            if (mask & group_mask).bit_count() < needed:
+                return None
+        return mask
+    return Rule(spec['name'], ('categories',), check)
+
+
+def compile_large_buys(spec):
+    min_sol = spec['min_sol']
+    count = spec.get('count', 1)
+    distinct = spec.get('distinct_channels', False)
+    excluded = frozenset(channel.lower() for channel in spec.get('exclude_channels', ()))
+
+    def check(facts, last):
+        # The running maxima answer one buy or two from different channels directly;
+        # other shapes (or an excluded channel among them) fall back to the per-channel
+        # bests, and only a non-distinct count above one scans every trade
+        if count == 1 and facts.largest and facts.largest.channel.lower() not in excluded:
+            buys = [facts.largest]
+        elif count == 2 and distinct and not any(trade.channel.lower() in excluded for trade in facts.top_two):
+            buys = facts.top_two
+        elif count == 1 or distinct:
+            buys = sorted((trade for channel, trade in facts.best_by_channel.items() if channel.lower() not in excluded),
+                          key=lambda trade: trade.amount, reverse=True)[:count]
+        else:
+            buys = sorted((trade for trade in facts.trades if trade.channel.lower() not in excluded),
+                          key=lambda trade: trade.amount, reverse=True)[:count]
+        if len(buys) < count or buys[-1].amount < min_sol:
+            return None
+        return list(buys)
+    return Rule(spec['name'], ('trades',), check)
+
+
+def compile_sol_sum(spec):
+    field = spec.get('field', 'buy_amount')
+    min_sol = spec['min_sol']
+    watch = tuple(spec.get('watch', [field]))
+    steps = sorted(spec.get('steps', []), reverse=True)
+
+    def check(facts, last):
+        value = facts[field]
+        if value < min_sol:
+            return None
+        current = tuple(facts[name] for name in watch)
+        if last is None:
+            return current
+        step = next((step for from_sol, step in steps if value >= from_sol), None)
+        if step is None:
+            return None
+        if any(abs(now - then) >= step for now, then in zip(current, last)):
+            return current
+        return None
+    return Rule(spec['name'], {field, *watch}, check, stateful=True)
+
+
+COMPILERS = {
+    'categories': compile_categories,
+    'large_buys': compile_large_buys,
+    'sol_sum': compile_sol_sum,
+}
+
+
+def load_rules(path=ALERT_RULES_FILE):
+    """Rule groups from the ALERT_RULES_FILE json (same layout as DEFAULT_RULES), falling back to the defaults"""
+    rules = {group: list(specs) for group, specs in DEFAULT_RULES.items()}
+    if path:
+        try:
+            with open(path) as f:
+                rules.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Error loading alert rules from {path}, using defaults: {e}")
+    return rules
+
+
+class RuleEngine:
+    """Evaluates compiled alert rules for the CA that just changed.
+
+    Callers pass the CA's facts and the names of the facts that changed; only
+    the rules reading one of those are run (the rule list for each changed-set
+    is worked out once and reused). Evaluation count, hits and time spent are
+    kept per rule.
+    """
+    def __init__(self, rule_specs=None):
+        self.groups = {}
+        for group, specs in (rule_specs or load_rules()).items():
+            self.groups[group] = [COMPILERS[spec['type']](spec) for spec in specs]
+        self.plans = {}
+        self.last = {}    # ca -> {(group, rule name): result of the rule's last firing}
+        self.stats = {(group, rule.name): [0, 0, 0] for group, rules in self.groups.items() for rule in rules}
+
+    def plan(self, group, changed):
+        key = (group, changed)
+        rules = self.plans.get(key)
+        if rules is None:
+            changed_set = set(changed)
+            rules = self.plans[key] = tuple(rule for rule in self.groups.get(group, ()) if rule.inputs & changed_set)
+        return rules
+
+    def evaluate(self, group, ca, facts, changed):
+        """Returns [(rule name, result)] for the rules in `group` that fire for `ca`"""
+        fired = []
+        for rule in self.plan(group, changed):
+            key = (group, rule.name)
+            stats = self.stats[key]
+            last = self.last.get(ca, {}).get(key) if rule.stateful else None
+            started = time.perf_counter_ns()
+            try:
+                result = rule.check(facts, last)
+            finally:
+                stats[0] += 1
+                stats[2] += time.perf_counter_ns() - started
+            if result:
+                stats[1] += 1
+                if rule.stateful:
+                    self.last.setdefault(ca, {})[key] = result
+                fired.append((rule.name, result))
+        return fired
+
+    def export_ca(self, ca):
+        last = self.last.get(ca)
+        return dict(last) if last else None
+
+    def import_ca(self, ca, last):
+        self.last[ca] = last
+
+    def forget(self, ca):
+        self.last.pop(ca, None)
+
+    def metrics(self):
+        return {
+            f"{group}/{name}": {
+                'evaluations': evaluations,
+                'fired': fired,
+                'avg_us': elapsed / evaluations / 1000 if evaluations else 0.0
+            }
+            for (group, name), (evaluations, fired, elapsed) in self.stats.items()
+        }
+
+    async def log_metrics(self, interval=300):
+        while True:
+            await asyncio.sleep(interval)
+            for name, m in self.metrics().items():
+                print(f"[RULES] {name}: evaluations={m['evaluations']} fired={m['fired']} "
+                      f"avg={m['avg_us']:.1f}us")
+
+
+alert_rules = RuleEngine()
@@ -1,13 +1,17 @@
 import requests
 import asyncio
-import aiohttp
-import re
 import time
 from datetime import datetime
-from env import TOKEN, MA_CHANNEL_ID, TWOX_CHANNEL_ID
-import os
+from env import MA_CHANNEL_ID, TWOX_CHANNEL_ID
 import sqlite3
 import create_tables
+from discordclient import DiscordClient
+from discordgateway import GatewayClient, INGESTION_MODE
+from pipeline import EventPipeline, message_key
+from dedup import BoundedDedup
+from embedfields import embed_parser
+from dexscreener import dex_client
+from ratelimiter import market_data_limiter
 
 create_tables.create_tables()
 
@@ -15,31 +19,16 @@ create_tables.create_tables()
 
 class ADScraper:
     def __init__(self):
-        self.url = "https://discord.com/api/v10/channels/{}/messages"
         self.last_message_ids = {}
-        self.processed_messages = set()
-        self.dex = Dex()  # This is now safe
-        
-        # Reset these values at start of each message processing
-        self.reset_values()
-
-    def reset_values(self):
-        """Reset all instance variables for new message processing"""
-        self.ca = None
-        self.twoxca = None
-        self.token_name = None
-        self.has_tg = False
-        self.has_x = False
-        self.swt_buy_amount = 0
-        self.fresh_buy_amount = 0
-        self.swt_wallet_types = []
-        self.fresh_wallet_type = None  
+        self.pipeline = EventPipeline()
 
         self.token_volume_data = {}
         self.volume_tracking_tasks = {}
         self.marketcap_tracking_tasks = {}
-        
-        self.individual_amounts = {
+
+    def new_individual_amounts(self):
+        """Per-message wallet category amounts - kept local so concurrent workers don't share them"""
+        return {
             'legend': 0,
             'kol regular': 0,
             'kol alpha': 0,
@@ -53,53 +42,44 @@ class ADScraper:
             'fresh 5sol 1m mc': 0 
         }
 
-    async def fetch_2x_channel(self, session, channel_id, channel_name):
-        headers = {'authorization': TOKEN}
-        url = self.url.format(channel_id)
+    async def enqueue_message(self, session, message, channel_name, processor):
+        """Hand a fetched message to the worker pool instead of processing it inline"""
+        schema = '2x' if processor == self.process_2x_channel else 'multi_alert'
+        key = message_key(message, schema, channel_name)
+        await self.pipeline.put(key, processor, session, message, channel_name)
 
+    async def fetch_2x_channel(self, discord, channel_id, channel_name):
+        # Per channel, so one channel's snowflake floor can't hide the other's messages
+        processed_messages = BoundedDedup(snowflake=True)
         while True:
             try:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        messages = await response.json()
-                        if messages:
-                            latest_message = messages[0]
-                            message_id = latest_message['id']
-                            if message_id not in self.processed_messages:
-                                print(f"Found new message in {channel_name}")
-                                self.processed_messages.add(message_id)
-                                await self.process_2x_channel(session, latest_message, channel_name)
-                            else:
-                                print(f"")
-                        else:
-                            print(f"No messages returned from api")
-                    else:
-                        print(f"Error failed to fetch messages from {channel_name}")
+                status, messages = await discord.fetch_new_messages(channel_id, self.last_message_ids)
+                if status == 200:
+                    for message in messages:
+                        message_id = message['id']
+                        if message_id not in processed_messages:
+                            print(f"Found new message in {channel_name}")
+                            processed_messages.add(message_id)
+                            await self.enqueue_message(discord.session, message, channel_name, self.process_2x_channel)
+                else:
+                    print(f"Error failed to fetch messages from {channel_name}")
                 await asyncio.sleep(15)
             except Exception as e:
                 print(f"Error in fetching 2x messages: {str(e)}")
                 await asyncio.sleep(5)
 
-    def normalize(self, ca: str) -> str:
-        return ca.strip().lower().replace('`', '')
-
     async def process_2x_channel(self, session, message, channel_name):
         try:
-            embeds = message.get('embeds', [])
-            if not embeds:
+            parsed = embed_parser.parse(message, '2x')
+            if parsed is None:
                 print(f"No embeds found!")
                 return
-            
-            embed = embeds[0]
 
-            description = embed.get('description', '').lower()
-            
-            ca_match = re.search(r'ca:\s*`([^`]+)`', description, re.IGNORECASE)
-            if not ca_match:
+            ca = parsed.get('ca')
+            if not ca:
                 print("No CA found in description")
                 return
             
-            ca = self.normalize(ca_match.group(1))
             print(f"Found CA: {ca}")
 
             conn = None
@@ -107,12 +87,9 @@ class ADScraper:
                 conn = sqlite3.connect('mcdb.db')
                 cursor = conn.cursor()
 
-                cursor.execute('''
-                SELECT id
-                FROM multialerts
-                WHERE LOWER(TRIM(REPLACE(ca, "`", ""))) = LOWER(TRIM(?))
-                COLLATE NOCASE
-                ''', (ca, ))
+                # CAs are stored in canonical base58, but rows written before that were
+                # lowercased and can't be restored, so match those too
+                cursor.execute('SELECT id FROM multialerts WHERE ca = ? OR ca = ?', (ca, str(ca).lower()))
 
                 result = cursor.fetchone()
 
@@ -138,33 +115,22 @@ class ADScraper:
             
 
 
-    async def fetch_ma_messages(self, session, channel_id, channel_name):
-        headers = {'authorization': TOKEN}
-
-        url = self.url.format(channel_id)
-
+    async def fetch_ma_messages(self, discord, channel_id, channel_name):
+        processed_messages = BoundedDedup(snowflake=True)
         while True:
             try:
                 #print(f"Checking for new messages...")  # Debug line
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        messages = await response.json()
-                        if messages:
-                            latest_message = messages[0]
-                            message_id = latest_message['id']
-                            #print(f"Latest message ID: {message_id}")  # Debug line
-                            #print(f"Processed messages count: {len(self.processed_messages)}")  # Debug line
-                            
-                            if message_id not in self.processed_messages:
-                                print(f"New message detected! Processing...")  # Debug line
-                                self.processed_messages.add(message_id)
-                                await self.process_ma_messages(session, latest_message, channel_name)
-                            else:
-                                print("")  # Debug line
-                        else:
-                            print("No messages returned from API")  # Debug line
-                    else:
-                        print(f"Error Failed to fetch messages from {channel_name}")
+                status, messages = await discord.fetch_new_messages(channel_id, self.last_message_ids)
+                if status == 200:
+                    for message in messages:
+                        message_id = message['id']
+                        #print(f"Processed messages count: {len(processed_messages)}")  # Debug line
+                        if message_id not in processed_messages:
+                            print(f"New message detected! Processing...")  # Debug line
+                            processed_messages.add(message_id)
+                            await self.enqueue_message(discord.session, message, channel_name, self.process_ma_messages)
+                else:
+                    print(f"Error Failed to fetch messages from {channel_name}")
                 await asyncio.sleep(7)  # Reduced sleep time to be more responsive
             except Exception as e:
                 print(f"Error in fetch_ma_messages: {str(e)}")
@@ -172,108 +138,100 @@ class ADScraper:
 
     async def process_ma_messages(self, session, message, channel_name):
         try:
-            self.reset_values()
-
-            embeds = message.get('embeds', [])
-            if not embeds:
+            swt_buy_amount = 0
+            fresh_buy_amount = 0
+            swt_wallet_types = []
+            fresh_wallet_type = None
+            individual_amounts = self.new_individual_amounts()
+
+            parsed = embed_parser.parse(message, 'multi_alert')
+            if parsed is None:
                 print(f"No embeds found for MA Channel")
                 return
-            
-            embed = embeds[0]
 
-            title = embed.get('title', '').lower()
+            title = parsed['title'].lower()
             if not title:
                 print(f"No title found")
                 return
-            
-            fields = embed.get('fields', [])
-            for field in fields:
-                token_fields = field.get('name', '').strip().lower()
-                #ca
-                if token_fields == "ca":
-                    ca = self.normalize(field.get('value', ''))
-                    print(ca)
-                    if not ca:
-                        print(f"Unable to fetch ca")
-                        return
-                #alert timestamp
-                alert_time = datetime.now()
-                #token name
-                if token_fields == "token name":
-                    token_name = field.get('value', '')
-                    print(token_name)
-                #socials
-                if token_fields == "telegram link":
-                    telegram_mssg = field.get('value', '').lower()
-                    has_tg = telegram_mssg != "no tg found"
-                    print(f"Has TG? {has_tg}")
-                if token_fields == "twitter link":
-                    twitter_mssg = field.get('value', '').lower()
-                    has_x = twitter_mssg != "no twitter link found"
-                    print(f"Has X? {has_x}")
-                #buy amounts
-                if "buy amounts" in token_fields:
-                    buy_amounts_text = field.get('value', '').strip()
-                    buy_lines = buy_amounts_text.split('\n')
-
-                    for line in buy_lines:
-                        if not line:
-                            continue
-
-                        parts = line.split(":")
-                        if len(parts) != 2:
-                            continue
-
-                        wallet_type = parts[0].strip().lower()
-                        try:
-                            amount = float(parts[1].strip().split()[0])
-                        except (ValueError, IndexError):
-                            print(f"Error parsing amount for wallet type: {wallet_type}")
-                            continue
-
-                        #track individual amounts
-                        if wallet_type in self.individual_amounts:
-                            self.individual_amounts[wallet_type] = amount
-
-                        if any(fresh_type in wallet_type for fresh_type in ['fresh', 'fresh 1h', 'fresh 5sol 1m mc']):
-                            self.fresh_wallet_type = wallet_type
-                            self.fresh_buy_amount = amount
-                        else:
-                            self.swt_wallet_types.append(wallet_type)
-                            self.swt_buy_amount += amount
-                    swt_wallet_types_str = ', '.join(self.swt_wallet_types)
-                    print(f"Processed buy amounts - SWT: {self.swt_buy_amount}, Fresh: {self.fresh_buy_amount}")
-                
+
+            #ca
+            ca = parsed.get('ca')
+            print(ca)
+            if not ca:
+                print(f"Unable to fetch ca")
+                return
+            #alert timestamp
+            alert_time = datetime.now()
+            #token name
+            token_name = parsed.get('token_name', '')
+            print(token_name)
+            #socials
+            has_tg = parsed.get('telegram_link', 'no tg found').lower() != "no tg found"
+            print(f"Has TG? {has_tg}")
+            has_x = parsed.get('twitter_link', 'no twitter link found').lower() != "no twitter link found"
+            print(f"Has X? {has_x}")
+            #buy amounts
+            swt_wallet_types_str = ''
+            buy_amounts_text = parsed.get('buy_amounts')
+            if buy_amounts_text is not None:
+                for line in buy_amounts_text.split('\n'):
+                    if not line:
+                        continue
+
+                    parts = line.split(":")
+                    if len(parts) != 2:
+                        continue
+
+                    wallet_type = parts[0].strip().lower()
+                    try:
+                        amount = float(parts[1].strip().split()[0])
+                    except (ValueError, IndexError):
+                        print(f"Error parsing amount for wallet type: {wallet_type}")
+                        continue
+
+                    #track individual amounts
+                    if wallet_type in individual_amounts:
+                        individual_amounts[wallet_type] = amount
+
+                    if 'fresh' in wallet_type:
+                        fresh_wallet_type = wallet_type
+                        fresh_buy_amount = amount
+                    else:
+                        swt_wallet_types.append(wallet_type)
+                        swt_buy_amount += amount
+                swt_wallet_types_str = ', '.join(swt_wallet_types)
+                print(f"Processed buy amounts - SWT: {swt_buy_amount}, Fresh: {fresh_buy_amount}")
+
             print(f"Fetching dex data for: {token_name}")
-            await self.dex.fetch_tokenomics(session, ca)
+            dex = await dex_client.snapshot(ca, retries=2)
 
-            if self.dex.token_on_dex:
+            if dex and dex.on_dex:
                 alert_data = {
                     'token_name': token_name,
                     'ca': ca,
                     'alert_time': alert_time,
-                    'swt_sol_amount': self.swt_buy_amount,
-                    'fresh_sol_amount': self.fresh_buy_amount,
+                    'swt_sol_amount': swt_buy_amount,
+                    'fresh_sol_amount': fresh_buy_amount,
                     'swt_wallet_types_str': swt_wallet_types_str,
-                    'fresh_wallet_type': self.fresh_wallet_type,
+                    'fresh_wallet_type': fresh_wallet_type,
                     'has_x': has_x,
                     'has_tg': has_tg,
-                    'liquidity': self.dex.token_liquidity,
-                    'initial_marketcap': self.dex.token_fdv,
-                    'volume_5m': self.dex.token_5m_vol,
-                    'volume_1h': self.dex.token_1h_vol,
-                    'volume_6h': self.dex.token_6h_vol,
-                    'volume_24h': self.dex.token_24h_vol,
-                    'buys_5m': self.dex.token_5m_buys,
-                    'sells_5m': self.dex.token_5m_sells,
-                    'buys_1h': self.dex.token_1h_buys,
-                    'sells_1h': self.dex.token_1h_sells,
-                    'buys_24h': self.dex.token_24h_buys,
-                    'sells_24h': self.dex.token_24h_sells,
-                    'price_change_5m': self.dex.token_5m_price_change,
-                    'price_change_1h': self.dex.token_1h_price_change,
-                    'price_change_24h': self.dex.token_24h_price_change,
-                    'individual_amounts': self.individual_amounts,
+                    'liquidity': dex.liquidity,
+                    'initial_marketcap': dex.market_cap,
+                    'volume_5m': dex.volume_5m,
+                    'volume_1h': dex.volume_1h,
+                    'volume_6h': dex.volume_6h,
+                    'volume_24h': dex.volume_24h,
+                    'buys_5m': dex.buys_5m,
+                    'sells_5m': dex.sells_5m,
+                    'buys_1h': dex.buys_1h,
+                    'sells_1h': dex.sells_1h,
+                    'buys_24h': dex.buys_24h,
+                    'sells_24h': dex.sells_24h,
+                    'price_change_5m': dex.price_change_5m,
+                    'price_change_1h': dex.price_change_1h,
+                    'price_change_24h': dex.price_change_24h,
+                    'individual_amounts': individual_amounts,
                     'two_x': False
                 }
                 
@@ -282,14 +240,14 @@ class ADScraper:
                 
                 # Then start volume tracking (don't wait for it)
                 if ca not in self.volume_tracking_tasks:
-                    initial_volume = self.dex.token_5m_vol
+                    initial_volume = dex.volume_5m
                     tracking_task = asyncio.create_task(
                         self.track_volume_intervals(session, ca, initial_volume)
                     )
                     self.volume_tracking_tasks[ca] = tracking_task
 
                 if ca not in self.marketcap_tracking_tasks:
-                    initial_marketcap = self.dex.token_fdv
+                    initial_marketcap = dex.market_cap
                     tracking_task = asyncio.create_task(
                         self.track_marketcap_intervals(session, ca, initial_marketcap)
                     )
@@ -470,8 +428,8 @@ class ADScraper:
                         await asyncio.sleep(wait_time)
                     
                     print(f"Fetching {interval_name} marketcap for {ca}...")
-                    await self.dex.fetch_tokenomics(session, ca)
-                    current_marketcap = self.dex.token_fdv
+                    dex = await dex_client.snapshot(ca, retries=2, batched=True, priority='interval')
+                    current_marketcap = dex.market_cap if dex else None
                     
                     # Update this interval's marketcap in database
                     await self.update_marketcap_interval(ca, interval_name, current_marketcap)
@@ -568,8 +526,8 @@ class ADScraper:
                         await asyncio.sleep(wait_time)
                     
                     print(f"Fetching {interval_name} volume for {ca}...")
-                    await self.dex.fetch_tokenomics(session, ca)
-                    current_volume = self.dex.token_5m_vol
+                    dex = await dex_client.snapshot(ca, retries=2, batched=True, priority='interval')
+                    current_volume = dex.volume_5m if dex else None
                     volumes[interval_name] = current_volume
                     
                     # Update this interval's volume in database
@@ -597,149 +555,26 @@ class ADScraper:
             if ca in self.volume_tracking_tasks:
                 del self.volume_tracking_tasks[ca]
 
-class Dex:
-    def __init__(self):
-        self.token_fdv = None
-        self.m5_vol = None
-        self.h1_vol = None
-        self.h6_vol = None
-        self.h24_vol = None
-        self.token_5m_vol = None
-        self.token_1h_vol = None
-        self.token_6h_vol = None
-        self.token_24h_vol = None
-        self.token_5m_buys = None
-        self.token_5m_sells = None
-        self.token_1h_buys = None
-        self.token_1h_sells = None
-        self.token_24h_buys = None
-        self.token_24h_sells = None
-        self.token_5m_price_change = None
-        self.token_1h_price_change = None
-        self.token_24h_price_change = None
-        self.token_liquidity = None
-        self.token_on_dex = False
-        self.token_on_pump = False
-    
-    async def fetch_tokenomics(self, session, ca, max_retries=3):
-        # Clean the contract address
-        ca = ca.strip().replace('`', '')
-        print(f"\nFetching Dex Data for: {ca}")
-        url = f"https://api.dexscreener.com/latest/dex/search?q={ca}"
-        print(f"Request URL: {url}")
-
-        for attempt in range(max_retries):
-            try:
-                async with session.get(url) as response:
-                    print(f"Response status: {response.status}")
-                    if response.status != 200:
-                        print(f"[ERROR] Attempt {attempt + 1}/{max_retries}")
-                        if attempt < max_retries - 1:
-                            print(f"Retrying in 60 seconds... ")
-                            await asyncio.sleep(60)
-                            continue
-                        return
-                    
-                    json_data = await response.json()
-                    #print(f"Raw API response: {json_data}")  # Debug print
-                    
-                    if not json_data:
-                        print("json_data is empty")
-                        continue
-                        
-                    if 'pairs' not in json_data:
-                        print("'pairs' not in json_data")
-                        continue
-                        
-                    if not json_data['pairs']:
-                        print("json_data['pairs'] is empty")
-                        continue
-
-                    #print(f"Found {len(json_data['pairs'])} pairs")
-                    self.token_on_dex = True
-
-                    for pair in json_data['pairs']:
-                        print(f"Processing pair: {pair.get('pairAddress', 'unknown')}")
-                        try:
-                            self.token_fdv = float(pair.get('fdv', 0))
-                            print(f"- Market Cap: ${self.token_fdv:,.2f}")
-
-                            # Volume data
-                            volume_data = pair.get('volume', {})
-                            self.token_5m_vol = float(volume_data.get('m5', 0))
-                            self.token_1h_vol = float(volume_data.get('h1', 0))
-                            self.token_6h_vol = float(volume_data.get('h6', 0))
-                            self.token_24h_vol = float(volume_data.get('h24', 0))
-                            print(f"- Volume Data Retrieved")
-                            print(f"  - 5m: ${self.token_5m_vol:,.2f}")
-                            print(f"  - 1h: ${self.token_1h_vol:,.2f}")
-                            print(f"  - 6h: ${self.token_6h_vol:,.2f}")
-                            print(f"  - 24h: ${self.token_24h_vol:,.2f}")
-
-                            # Transaction data
-                            txns_data = pair.get('txns', {})
-                            m5_txns = txns_data.get('m5', {})
-                            self.token_5m_buys = int(m5_txns.get('buys', 0))
-                            self.token_5m_sells = int(m5_txns.get('sells', 0))
-                            h1_txns = txns_data.get('h1', {})
-                            self.token_1h_buys = int(h1_txns.get('buys', 0))
-                            self.token_1h_sells = int(h1_txns.get('sells', 0))
-                            h24_txns = txns_data.get('h24', {})
-                            self.token_24h_buys = int(h24_txns.get('buys', 0))
-                            self.token_24h_sells = int(h24_txns.get('sells', 0))
-                            print("- Transaction Data Retrieved")
-                            print(f"  - 5m: {self.token_5m_buys} buys, {self.token_5m_sells} sells")
-                            print(f"  - 1h: {self.token_1h_buys} buys, {self.token_1h_sells} sells")
-                            print(f"  - 24h: {self.token_24h_buys} buys, {self.token_24h_sells} sells")
-
-                            # Price changes
-                            price_data = pair.get('priceChange', {})
-                            self.token_5m_price_change = price_data.get('m5', 0)
-                            self.token_1h_price_change = price_data.get('h1', 0) 
-                            self.token_24h_price_change = price_data.get('h24', 0)
-                            print("- Price Change Data Retrieved")
-                            print(f"  - 5m: {self.token_5m_price_change}%")
-                            print(f"  - 1h: {self.token_1h_price_change}%")
-                            print(f"  - 24h: {self.token_24h_price_change}%")
-                            
-                            # Liquidity
-                            liquidity_data = pair.get('liquidity', {})
-                            self.token_liquidity = float(liquidity_data.get('usd', 0))
-                            print(f"- Liquidity: ${self.token_liquidity:,.2f}")
-                            
-                            return  # Return after successful processing
-
-                        except Exception as e:
-                            print(f"Error processing pair data: {str(e)}")
-                            print(f"Error type: {type(e)}")
-                            import traceback
-                            traceback.print_exc()
-                            continue
-
-                    print("No valid pairs processed")
-                    return
-
-            except aiohttp.ClientError as e:
-                print(f"Network error: {str(e)}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(60)
-                    continue
-            except Exception as e:
-                print(f"Unexpected error: {str(e)}")
-                print(f"Error type: {type(e)}")
-                import traceback
-                traceback.print_exc()
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(60)
-                    continue
-
 async def main():
     scraper = ADScraper()
-    async with aiohttp.ClientSession() as session:
-        tasks = [
-            scraper.fetch_ma_messages(session, MA_CHANNEL_ID, 'Multi-Alert Channel'),
-            scraper.fetch_2x_channel(session, TWOX_CHANNEL_ID, 'Two-x Channel')
-        ]
+    async with DiscordClient() as discord:
+        scraper.pipeline.start()
+
+        if INGESTION_MODE == 'gateway':
+            handlers = {
+                MA_CHANNEL_ID: (scraper.enqueue_message, ('Multi-Alert Channel', scraper.process_ma_messages)),
+                TWOX_CHANNEL_ID: (scraper.enqueue_message, ('Two-x Channel', scraper.process_2x_channel))
+            }
+            gateway = GatewayClient(discord.session, handlers, cursors=scraper.last_message_ids)
+            tasks = [gateway.run()]
+        else:
+            tasks = [
+                scraper.fetch_ma_messages(discord, MA_CHANNEL_ID, 'Multi-Alert Channel'),
+                scraper.fetch_2x_channel(discord, TWOX_CHANNEL_ID, 'Two-x Channel')
+            ]
+        tasks.append(scraper.pipeline.log_metrics())
+        tasks.append(dex_client.log_metrics())
+        tasks.append(market_data_limiter.log_metrics())
         try:
             await asyncio.gather(*tasks)  # Remove await from inside the list
         except Exception as e:
@@ -0,0 +1,116 @@
+import heapq
+import os
+import time
+
+
+MULTI_ALERT_WINDOW_MINUTES = float(os.getenv('MULTI_ALERT_WINDOW_MINUTES', 60))
+
+# Bit order follows the order categories are listed in alerts
+SWT_CATEGORIES = ['Legend Alpha', 'Kol Alpha', 'Kol Regular', 'Whale', 'Smart',
+                  'Challenge', 'High Freq', 'Degen', 'Insider']
+FRESH_CATEGORIES = ['Fresh', 'Fresh 1h', 'Fresh 5sol 1m MC']
+CATEGORIES = SWT_CATEGORIES + FRESH_CATEGORIES
+
+CATEGORY_BITS = {name: 1 << bit for bit, name in enumerate(CATEGORIES)}
+SWT_MASK = sum(CATEGORY_BITS[name] for name in SWT_CATEGORIES)
+FRESH_MASK = sum(CATEGORY_BITS[name] for name in FRESH_CATEGORIES)
+
+
+def category_names(mask):
+    return [name for name in CATEGORIES if mask & CATEGORY_BITS[name]]
+
+
+class CategoryIndex:
+    """CA -> bitmask of the wallet categories (channels) that bought it recently.
+
+    A category only counts for `window` seconds after the last buy seen in it.
+    Each set bit has one deadline in a min-heap; the reaper pops due deadlines,
+    re-arms the ones whose category was seen again in the meantime and clears
+    the rest. A CA with no bits left is dropped and `on_evict(ca)` is called so
+    owners can release the state they keep per CA.
+
+    Each entry is [mask, first_seen, last_seen, {bit: last seen}].
+    """
+    def __init__(self, window=MULTI_ALERT_WINDOW_MINUTES * 60, on_evict=None):
+        self.window = window
+        self.on_evict = on_evict
+        self.entries = {}
+        self.deadlines = []   # heap of (expires_at, ca, bit)
+
+    def __contains__(self, ca):
+        return ca in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, ca, category, seen_at=None):
+        """Record a buy of `ca` in `category` at `seen_at` (unix time, default now).
+
+        Returns False, recording nothing, when `seen_at` is already outside the window.
+        """
+        now = time.time()
+        seen_at = seen_at or now
+        self.reap(now)
+        if seen_at + self.window <= now:
+            return False  # Already outside the window, e.g. an old message replayed by the backfill
+
+        bit = CATEGORY_BITS[category]
+        entry = self.entries.get(ca)
+        if entry is None:
+            entry = self.entries[ca] = [0, seen_at, seen_at, {}]
+        if not entry[0] & bit:
+            entry[0] |= bit
+            heapq.heappush(self.deadlines, (seen_at + self.window, ca, bit))
+        entry[1] = min(entry[1], seen_at)
+        entry[2] = max(entry[2], seen_at)
+        entry[3][bit] = max(entry[3].get(bit, 0), seen_at)
+        return True
+
+    def export_ca(self, ca):
+        entry = self.entries.get(ca)
+        return [entry[0], entry[1], entry[2], dict(entry[3])] if entry else None
+
+    def import_ca(self, ca, entry):
+        """Restore an entry saved by `export_ca`; categories already outside the window expire on the next reap"""
+        self.entries[ca] = entry
+        for bit, seen_at in entry[3].items():
+            heapq.heappush(self.deadlines, (seen_at + self.window, ca, bit))
+
+    def mask(self, ca):
+        self.reap()
+        entry = self.entries.get(ca)
+        return entry[0] if entry else 0
+
+    def seen(self, ca):
+        """{category bit: last seen} for the categories still inside the window"""
+        self.reap()
+        entry = self.entries.get(ca)
+        return entry[3] if entry else {}
+
+    def first_seen(self, ca):
+        entry = self.entries.get(ca)
+        return entry[1] if entry else None
+
+    def last_seen(self, ca):
+        entry = self.entries.get(ca)
+        return entry[2] if entry else None
+
+    def reap(self, now=None):
+        now = now or time.time()
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, ca, bit = heapq.heappop(self.deadlines)
+            entry = self.entries.get(ca)
+            if entry is None or not entry[0] & bit:
+                continue
+
+            expires_at = entry[3][bit] + self.window
+            if expires_at > now:
+                heapq.heappush(self.deadlines, (expires_at, ca, bit))
+                continue
+
+            entry[0] &= ~bit
+            del entry[3][bit]
+            if not entry[0]:
+                del self.entries[ca]
+                if self.on_evict:
+                    self.on_evict(ca)
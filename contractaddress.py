@@ -0,0 +1,92 @@
+import sqlite3
+import weakref
+from functools import lru_cache
+
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+BASE58_VALUES = {char: value for value, char in enumerate(BASE58_ALPHABET)}
+CA_SIZE = 32
+
+
+def b58decode(text):
+    """Base58 text -> bytes, or None if the text isn't valid base58"""
+    number = 0
+    for char in text:
+        value = BASE58_VALUES.get(char)
+        if value is None:
+            return None
+        number = number * 58 + value
+    leading_zeros = len(text) - len(text.lstrip('1'))
+    body = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    return b'\x00' * leading_zeros + body
+
+
+@lru_cache(maxsize=1024)
+def b58encode(raw):
+    number = int.from_bytes(raw, 'big')
+    chars = []
+    while number:
+        number, remainder = divmod(number, 58)
+        chars.append(BASE58_ALPHABET[remainder])
+    leading_zeros = len(raw) - len(raw.lstrip(b'\x00'))
+    return '1' * leading_zeros + ''.join(reversed(chars))
+
+
+class ContractAddress:
+    """A Solana token address held as its 32 raw bytes.
+
+    Instances are interned: there is exactly one live object per address, so
+    dict and set lookups hash and compare by identity, and every module that
+    parses the same text gets the same key. The base58 text is only rebuilt
+    when the address is printed, formatted or written to SQLite (recently
+    rendered addresses are cached).
+    """
+    __slots__ = ('raw', '__weakref__')
+
+    interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, raw):
+        ca = cls.interned.get(raw)
+        if ca is None:
+            ca = super().__new__(cls)
+            ca.raw = raw
+            cls.interned[raw] = ca
+        return ca
+
+    def __lt__(self, other):
+        return self.raw < other.raw
+
+    def __reduce__(self):
+        return (ContractAddress, (self.raw,))
+
+    def __str__(self):
+        return b58encode(self.raw)
+
+    def __repr__(self):
+        return f"ContractAddress('{self}')"
+
+    def __format__(self, spec):
+        # Lets log lines keep truncating with f"{ca:.8}"
+        return format(str(self), spec)
+
+
+@lru_cache(maxsize=4096)
+def parse_text(text):
+    raw = b58decode(text.strip().strip('`').strip())
+    if raw is None or len(raw) != CA_SIZE:
+        return None
+    return ContractAddress(raw)
+
+
+def parse_ca(value):
+    """Canonical ContractAddress for a CA string (backticks and whitespace allowed), or None if invalid"""
+    if isinstance(value, ContractAddress):
+        return value
+    if not value:
+        return None
+    return parse_text(value)
+
+
+sqlite3.register_adapter(ContractAddress, str)
+
+WRAPPED_SOL = parse_ca('So11111111111111111111111111111111111111112')
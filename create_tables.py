@@ -74,6 +74,15 @@ def create_tables():
     )
     ''')
 
+    # Last processed message per channel, used to backfill after a restart
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS channel_cursors (
+        channel_id TEXT PRIMARY KEY,
+        last_message_id TEXT NOT NULL,
+        updated_at TIMESTAMP NOT NULL
+    )
+    ''')
+
     conn.commit()
     conn.close()
     print(f"DB Created Successfully!")
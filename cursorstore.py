@@ -0,0 +1,79 @@
+import asyncio
+import heapq
+import sqlite3
+from datetime import datetime
+
+
+class CursorStore:
+    """Persists the last fully processed message id per channel to SQLite.
+
+    A message counts as processed once its handler has finished. Because the
+    pipeline finishes messages out of order, the committed cursor only moves
+    past ids with nothing older still in flight, so a restart never skips a
+    message that was fetched but not yet handled.
+    """
+    def __init__(self, db_path='mcdb.db'):
+        self.db_path = db_path
+        self.pending = {}     # channel_id -> ids fetched but not yet processed
+        self.done = {}        # channel_id -> heap of processed ids waiting on older pending ones
+        self.committed = {}   # channel_id -> last message id safe to resume after
+        self.dirty = set()
+
+    def load(self):
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('SELECT channel_id, last_message_id FROM channel_cursors')
+            self.committed = {channel_id: message_id for channel_id, message_id in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error loading channel cursors: {e}")
+        finally:
+            if conn:
+                conn.close()
+        return dict(self.committed)
+
+    def started(self, channel_id, message_id):
+        self.pending.setdefault(channel_id, set()).add(int(message_id))
+
+    def finished(self, channel_id, message_id):
+        message_id = int(message_id)
+        pending = self.pending.setdefault(channel_id, set())
+        pending.discard(message_id)
+        done = self.done.setdefault(channel_id, [])
+        heapq.heappush(done, message_id)
+
+        oldest_pending = min(pending) if pending else None
+        while done and (oldest_pending is None or done[0] < oldest_pending):
+            latest = heapq.heappop(done)
+            committed = self.committed.get(channel_id)
+            if committed is None or latest > int(committed):
+                self.committed[channel_id] = str(latest)
+                self.dirty.add(channel_id)
+
+    def save(self):
+        if not self.dirty:
+            return
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            now = datetime.now()
+            cursor.executemany('''
+            INSERT OR REPLACE INTO channel_cursors (channel_id, last_message_id, updated_at)
+            VALUES (?, ?, ?)
+            ''', [(channel_id, self.committed[channel_id], now) for channel_id in self.dirty])
+            conn.commit()
+            self.dirty.clear()
+        except Exception as e:
+            print(f"Error saving channel cursors: {e}")
+            if conn:
+                conn.rollback()
+        finally:
+            if conn:
+                conn.close()
+
+    async def flush_periodically(self, interval=5):
+        while True:
+            await asyncio.sleep(interval)
+            self.save()
@@ -0,0 +1,67 @@
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+
+
+class BoundedDedup:
+    """Set-like record of processed ids that can't grow forever.
+
+    Entries expire after `ttl` seconds or once more than `max_entries` are held,
+    oldest first. Values are stored as 8-byte hashes instead of the original
+    strings. With `snowflake=True` the values are Discord message ids: anything
+    at or below the newest evicted id counts as already seen, so most lookups
+    for old messages are a single integer comparison.
+    """
+    def __init__(self, max_entries=10000, ttl=None, snowflake=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.snowflake = snowflake
+        self.entries = OrderedDict()  # key -> time added
+        self.floor = 0
+
+    def key(self, value):
+        if self.snowflake:
+            return int(value)
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def __contains__(self, value):
+        key = self.key(value)
+        if self.snowflake and key <= self.floor:
+            return True
+        self.expire()
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, value):
+        key = self.key(value)
+        if key not in self.entries:
+            self.entries[key] = time.monotonic()
+        self.expire()
+
+    def update(self, values):
+        """Add many values, expiring once at the end"""
+        now = time.monotonic()
+        for value in values:
+            self.entries.setdefault(self.key(value), now)
+        self.expire()
+
+    def expire(self):
+        cutoff = time.monotonic() - self.ttl if self.ttl else None
+        while self.entries:
+            oldest_key = next(iter(self.entries))
+            if len(self.entries) <= self.max_entries and (cutoff is None or self.entries[oldest_key] >= cutoff):
+                break
+            self.entries.popitem(last=False)
+            if self.snowflake:
+                self.floor = max(self.floor, oldest_key)
+
+    def memory_usage(self):
+        """Approximate bytes held by the container, its keys and timestamps"""
+        size = sys.getsizeof(self.entries)
+        for key, added in self.entries.items():
+            size += sys.getsizeof(key) + sys.getsizeof(added)
+        return size
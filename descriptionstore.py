@@ -0,0 +1,75 @@
+import asyncio
+import sys
+
+
+class DescriptionStore:
+    """One shared copy of every swap description the trackers hold on to.
+
+    `add` hands out a stable integer id (the same id for the same text) and
+    takes a reference on it; trackers keep the id instead of the string and
+    call `release` when they drop it. A description is evicted once nothing
+    references it any more. Ids are never reused.
+    """
+    def __init__(self):
+        self.texts = {}   # id -> description
+        self.ids = {}     # description -> id
+        self.refs = {}    # id -> number of tracker references
+        self.next_id = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, text):
+        description_id = self.ids.get(text)
+        if description_id is None:
+            description_id = self.next_id
+            self.next_id += 1
+            self.texts[description_id] = text
+            self.ids[text] = description_id
+            self.refs[description_id] = 0
+        self.refs[description_id] += 1
+        return description_id
+
+    def find(self, text):
+        """Id of a stored description without taking a reference, or None"""
+        return self.ids.get(text)
+
+    def get(self, description_id):
+        return self.texts.get(description_id, '')
+
+    def release(self, description_id):
+        refs = self.refs.get(description_id)
+        if refs is None:
+            return
+        if refs > 1:
+            self.refs[description_id] = refs - 1
+            return
+        del self.refs[description_id]
+        del self.ids[self.texts.pop(description_id)]
+        self.evicted += 1
+
+    def memory_usage(self):
+        """Approximate bytes held by the store: the strings once, plus the index dicts and ids"""
+        size = sys.getsizeof(self.texts) + sys.getsizeof(self.ids) + sys.getsizeof(self.refs)
+        for description_id, text in self.texts.items():
+            size += sys.getsizeof(text) + sys.getsizeof(description_id)
+        return size
+
+    def metrics(self):
+        return {
+            'descriptions': len(self.texts),
+            'references': sum(self.refs.values()),
+            'evicted': self.evicted,
+            'memory_bytes': self.memory_usage()
+        }
+
+    async def log_metrics(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            m = self.metrics()
+            print(f"[DESCRIPTIONS] stored={m['descriptions']} refs={m['references']} "
+                  f"evicted={m['evicted']} memory={m['memory_bytes'] / 1024:.1f}KB")
+
+
+descriptions = DescriptionStore()
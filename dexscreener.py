@@ -0,0 +1,381 @@
+import asyncio
+import aiohttp
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from ratelimiter import market_data_limiter, PRIORITIES
+
+
+DEXSCREENER_API_URL = "https://api.dexscreener.com"
+DEX_CACHE_SECONDS = float(os.getenv('DEX_CACHE_SECONDS', 15))
+DEX_BATCH_SECONDS = float(os.getenv('DEX_BATCH_SECONDS', 5))
+DEX_PAIR_REFRESH_SECONDS = float(os.getenv('DEX_PAIR_REFRESH_SECONDS', 3600))
+CHAIN_ID = 'solana'
+MAX_TOKENS_PER_REQUEST = 30   # DexScreener's limit for /latest/dex/tokens
+
+
+def pair_liquidity(pair):
+    return float((pair.get('liquidity') or {}).get('usd') or 0)
+
+
+def best_pair(ca, pairs):
+    """The deepest Solana pair trading `ca`, or None when `pairs` is empty.
+
+    Search results can include pairs that only mention the CA, so pairs where
+    it is neither side are only used when nothing else matches.
+    """
+    pairs = [pair for pair in pairs or () if pair.get('chainId', CHAIN_ID) == CHAIN_ID] or list(pairs or ())
+    trading = [pair for pair in pairs
+               if ca in ((pair.get('baseToken') or {}).get('address'), (pair.get('quoteToken') or {}).get('address'))]
+    return max(trading or pairs, key=pair_liquidity, default=None)
+
+
+@dataclass(frozen=True, slots=True)
+class TokenSnapshot:
+    """DexScreener's view of a token at `fetched_at` (unix time), taken from one of its pairs.
+
+    Immutable, so one snapshot can be cached and handed to any number of tasks.
+    Numbers are None when the token has no pair on DexScreener.
+    """
+    ca: str
+    fetched_at: float
+    on_dex: bool = False
+    on_pump: bool = False
+    pair_address: str = None
+    market_cap: float = None
+    liquidity: float = None
+    volume_5m: float = None
+    volume_1h: float = None
+    volume_6h: float = None
+    volume_24h: float = None
+    buys_5m: int = None
+    sells_5m: int = None
+    buys_1h: int = None
+    sells_1h: int = None
+    buys_6h: int = None
+    sells_6h: int = None
+    buys_24h: int = None
+    sells_24h: int = None
+    price_change_5m: float = None
+    price_change_1h: float = None
+    price_change_6h: float = None
+    price_change_24h: float = None
+    tg_link: str = None
+    x_link: str = None
+    dex_url: str = None
+
+    @classmethod
+    def from_pair(cls, ca, pair, fetched_at=None):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        if not pair:
+            # Not listed on a DEX yet, so most likely still on Pump
+            return cls(ca, fetched_at, on_pump=True)
+
+        volume = pair.get('volume') or {}
+        txns = pair.get('txns') or {}
+        price_change = pair.get('priceChange') or {}
+        links = {}
+        for social in (pair.get('info') or {}).get('socials', []):
+            links.setdefault(social.get('type'), social.get('url'))
+        return cls(
+            ca, fetched_at,
+            on_dex=True,
+            pair_address=pair.get('pairAddress'),
+            market_cap=float(pair.get('fdv') or 0),
+            liquidity=float((pair.get('liquidity') or {}).get('usd') or 0),
+            volume_5m=float(volume.get('m5') or 0),
+            volume_1h=float(volume.get('h1') or 0),
+            volume_6h=float(volume.get('h6') or 0),
+            volume_24h=float(volume.get('h24') or 0),
+            buys_5m=int(txns.get('m5', {}).get('buys', 0)),
+            sells_5m=int(txns.get('m5', {}).get('sells', 0)),
+            buys_1h=int(txns.get('h1', {}).get('buys', 0)),
+            sells_1h=int(txns.get('h1', {}).get('sells', 0)),
+            buys_6h=int(txns.get('h6', {}).get('buys', 0)),
+            sells_6h=int(txns.get('h6', {}).get('sells', 0)),
+            buys_24h=int(txns.get('h24', {}).get('buys', 0)),
+            sells_24h=int(txns.get('h24', {}).get('sells', 0)),
+            price_change_5m=price_change.get('m5', 0),
+            price_change_1h=price_change.get('h1', 0),
+            price_change_6h=price_change.get('h6', 0),
+            price_change_24h=price_change.get('h24', 0),
+            tg_link=links.get('telegram'),
+            x_link=links.get('twitter'),
+            dex_url=pair.get('url', '')
+        )
+
+    @classmethod
+    def unknown(cls, ca):
+        """Placeholder for a token whose lookup failed"""
+        return cls(ca, time.time())
+
+
+class DexScreenerClient:
+    """Shared DexScreener client for every token lookup in the process.
+
+    Owns one pooled aiohttp session. Lookups return a TokenSnapshot that is
+    cached for `ttl` seconds, and concurrent lookups of the same CA while a
+    request is in flight wait on that request instead of sending their own, so
+    a burst of activity on one token costs a single upstream call. Failed
+    lookups aren't cached.
+
+    Periodic refreshes that can wait a few seconds pass `batched=True`: CAs
+    that come due within `batch_window` seconds are looked up together through
+    /latest/dex/tokens, up to MAX_TOKENS_PER_REQUEST per call, and each waiter
+    gets its own CA's snapshot back.
+
+    The pair a CA is sampled from is resolved once, by search, as its deepest
+    Solana pair, and kept for `pair_refresh` seconds. Until then unbatched
+    lookups fetch just that pair from /latest/dex/pairs, which is much smaller
+    than a search result, and batched ones pick it out of the tokens response,
+    so samples of a CA come from the same pair.
+
+    Every request goes through `limiter` at the caller's priority (see
+    ratelimiter.PRIORITIES). A lookup only joins an in-flight request of the
+    same or better priority, so an alert never waits on a queued background
+    refresh. A 429 holds the limiter for its Retry-After and the request is
+    sent again. `base_url` can point at a local stub server for testing.
+    """
+    def __init__(self, base_url=DEXSCREENER_API_URL, ttl=DEX_CACHE_SECONDS, batch_window=DEX_BATCH_SECONDS,
+                 batch_size=MAX_TOKENS_PER_REQUEST, limiter=market_data_limiter, max_retries=3,
+                 pair_refresh=DEX_PAIR_REFRESH_SECONDS):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.pair_refresh = pair_refresh
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.session = None
+
+        self.cache = OrderedDict()   # ca -> (cached_at, TokenSnapshot), oldest fetch first
+        self.inflight = {}           # ca -> (task or future that will deliver its snapshot, priority rank)
+        self.pairs = OrderedDict()   # ca -> (pair address, resolved_at), oldest resolution first
+        self.batch = []              # (ca, future) waiting for the next tokens request
+        self.batch_rank = None       # best priority rank in the batch
+        self.batch_timer = None
+        self.batch_tasks = set()
+
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'requests': 0, 'errors': 0,
+                      'rate_limited': 0, 'batches': 0, 'batched_tokens': 0, 'pair_fetches': 0, 'resolutions': 0}
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    def expire(self, now):
+        while self.cache:
+            ca, (cached_at, _) = next(iter(self.cache.items()))
+            if now - cached_at < self.ttl:
+                break
+            del self.cache[ca]
+        while self.pairs:
+            ca, (_, resolved_at) = next(iter(self.pairs.items()))
+            if now - resolved_at < self.pair_refresh:
+                break
+            del self.pairs[ca]
+
+    def resolve(self, ca, pair):
+        """Remember `pair` as the one to sample `ca` from, keeping an unexpired resolution"""
+        address = pair and pair.get('pairAddress')
+        if address and ca not in self.pairs:
+            self.pairs[ca] = (address, time.monotonic())
+            self.stats['resolutions'] += 1
+
+    async def snapshot(self, ca, retries=0, retry_delay=2, batched=False, priority='alert'):
+        """A TokenSnapshot for `ca`, or None when the lookup (and its `retries`) failed.
+
+        Failed attempts are retried after `retry_delay` seconds, doubling each
+        time. Rate limiting is handled by the limiter and doesn't use up retries.
+        """
+        for attempt in range(retries + 1):
+            snapshot = await self.lookup(str(ca), batched, priority)
+            if snapshot is not None or attempt == retries:
+                return snapshot
+            delay = retry_delay * 2 ** attempt
+            print(f"[ERROR] Dex Screener lookup attempt {attempt + 1}/{retries + 1} failed, "
+                  f"retrying in {delay} seconds...")
+            await asyncio.sleep(delay)
+
+    async def lookup(self, ca, batched=False, priority='alert'):
+        now = time.monotonic()
+        self.expire(now)
+        cached = self.cache.get(ca)
+        if cached is not None:
+            self.stats['hits'] += 1
+            return cached[1]
+
+        rank = PRIORITIES.index(priority)
+        pending, pending_rank = self.inflight.get(ca, (None, None))
+        if pending is not None and pending_rank <= rank:
+            self.stats['coalesced'] += 1
+        elif batched:
+            self.stats['misses'] += 1
+            pending = asyncio.get_running_loop().create_future()
+            self.inflight[ca] = (pending, rank)
+            self.batch.append((ca, pending))
+            self.batch_rank = rank if self.batch_rank is None else min(self.batch_rank, rank)
+            if len(self.batch) >= self.batch_size:
+                self.send_batch()
+            elif self.batch_timer is None:
+                self.batch_timer = asyncio.create_task(self.send_batch_later())
+        else:
+            self.stats['misses'] += 1
+            pending = asyncio.create_task(self.fetch(ca, priority))
+            self.inflight[ca] = (pending, rank)
+        # Shielded so a caller being cancelled doesn't cancel the request for everyone else
+        return await asyncio.shield(pending)
+
+    def done(self, ca, pending):
+        # A better priority lookup may have replaced this request meanwhile
+        if self.inflight.get(ca, (None,))[0] is pending:
+            del self.inflight[ca]
+
+    def send_batch(self):
+        entries, self.batch = self.batch[:self.batch_size], self.batch[self.batch_size:]
+        task = asyncio.create_task(self.fetch_tokens(entries, PRIORITIES[self.batch_rank]))
+        if not self.batch:
+            self.batch_rank = None
+        self.batch_tasks.add(task)
+        task.add_done_callback(self.batch_tasks.discard)
+
+    async def send_batch_later(self):
+        await asyncio.sleep(self.batch_window)
+        self.batch_timer = None
+        while self.batch:
+            self.send_batch()
+
+    async def request(self, url, priority, params=None):
+        """GET `url` once the limiter allows it, resending after 429s. Returns (status, json)"""
+        await self.start()
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(priority)
+            self.stats['requests'] += 1
+            async with self.session.get(url, params=params) as response:
+                if response.status == 429:
+                    self.stats['rate_limited'] += 1
+                    try:
+                        retry_after = float(response.headers.get('Retry-After', 5))
+                    except ValueError:
+                        retry_after = 5.0
+                    self.limiter.block(retry_after)
+                    print(f"[RATE LIMIT] Dex Screener - retrying in {retry_after:.2f}s "
+                          f"(attempt {attempt + 1}/{self.max_retries + 1})")
+                    continue
+                if response.status != 200:
+                    return response.status, None
+                return 200, await response.json()
+        return 429, None
+
+    async def fetch_pair(self, address, priority):
+        """(status, the pair at `address` or None) from the pairs endpoint"""
+        status, json_data = await self.request(f"{self.base_url}/latest/dex/pairs/{CHAIN_ID}/{address}", priority)
+        self.stats['pair_fetches'] += 1
+        if status != 200 or not json_data:
+            return status, None
+        return status, json_data.get('pair') or next(iter(json_data.get('pairs') or ()), None)
+
+    async def fetch(self, ca, priority):
+        try:
+            pair = None
+            resolved = self.pairs.get(ca)
+            if resolved is not None:
+                status, pair = await self.fetch_pair(resolved[0], priority)
+                if status != 200:
+                    self.stats['errors'] += 1
+                    print(f"[ERROR] Dex Screener API Returned Status: {status}")
+                    return None
+                if pair is None:
+                    # The pair is gone, so find the best one again
+                    self.pairs.pop(ca, None)
+            if pair is None:
+                status, json_data = await self.request(f"{self.base_url}/latest/dex/search", priority, params={'q': ca})
+                if status != 200:
+                    self.stats['errors'] += 1
+                    print(f"[ERROR] Dex Screener API Returned Status: {status}")
+                    return None
+                pair = best_pair(ca, (json_data or {}).get('pairs'))
+                self.resolve(ca, pair)
+            snapshot = TokenSnapshot.from_pair(ca, pair)
+            self.cache[ca] = (time.monotonic(), snapshot)
+            self.cache.move_to_end(ca)
+            return snapshot
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"[ERROR] Dex Screener request failed for {ca:.8}...: {str(e)}")
+            return None
+        finally:
+            self.done(ca, asyncio.current_task())
+
+    async def fetch_tokens(self, entries, priority):
+        """One /latest/dex/tokens request for up to `batch_size` CAs, resolving each CA's waiters"""
+        cas = [ca for ca, _ in entries]
+        snapshots = {}
+        try:
+            self.stats['batches'] += 1
+            self.stats['batched_tokens'] += len(cas)
+            status, json_data = await self.request(f"{self.base_url}/latest/dex/tokens/{','.join(cas)}", priority)
+            if status != 200:
+                self.stats['errors'] += 1
+                print(f"[ERROR] Dex Screener API Returned Status: {status} for {len(cas)} tokens")
+                return
+
+            # Pairs for every requested token come back in one list, so sort them
+            # out by the side of the pair that is one of ours
+            wanted = set(cas)
+            pairs_by_ca = {}
+            for pair in (json_data or {}).get('pairs') or []:
+                address = (pair.get('baseToken') or {}).get('address')
+                if address not in wanted:
+                    address = (pair.get('quoteToken') or {}).get('address')
+                if address in wanted:
+                    pairs_by_ca.setdefault(address, []).append(pair)
+
+            fetched_at = time.time()
+            cached_at = time.monotonic()
+            for ca in cas:
+                pairs = pairs_by_ca.get(ca, ())
+                resolved = self.pairs.get(ca)
+                pair = next((pair for pair in pairs if resolved and pair.get('pairAddress') == resolved[0]), None)
+                if pair is None:
+                    self.pairs.pop(ca, None)
+                    pair = best_pair(ca, pairs)
+                    self.resolve(ca, pair)
+                snapshot = snapshots[ca] = TokenSnapshot.from_pair(ca, pair, fetched_at)
+                self.cache[ca] = (cached_at, snapshot)
+                self.cache.move_to_end(ca)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"[ERROR] Dex Screener batch request failed for {len(cas)} tokens: {str(e)}")
+        finally:
+            for ca, waiter in entries:
+                self.done(ca, waiter)
+                if not waiter.done():
+                    waiter.set_result(snapshots.get(ca))
+
+    def metrics(self):
+        lookups = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced']
+        return {
+            **self.stats,
+            'cached': len(self.cache),
+            'resolved_pairs': len(self.pairs),
+            'hit_rate': (self.stats['hits'] + self.stats['coalesced']) / lookups if lookups else 0.0
+        }
+
+    async def log_metrics(self, interval=300):
+        while True:
+            await asyncio.sleep(interval)
+            m = self.metrics()
+            print(f"[DEX] requests={m['requests']} hits={m['hits']} misses={m['misses']} "
+                  f"coalesced={m['coalesced']} errors={m['errors']} rate_limited={m['rate_limited']} "
+                  f"cached={m['cached']} hit_rate={m['hit_rate']:.0%} batches={m['batches']} "
+                  f"batched_tokens={m['batched_tokens']} pair_fetches={m['pair_fetches']} "
+                  f"resolutions={m['resolutions']} resolved_pairs={m['resolved_pairs']}")
+
+
+dex_client = DexScreenerClient()
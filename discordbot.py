@@ -3,6 +3,8 @@ from discord import app_commands
 from discord.ext import commands
 import asyncio, aiohttp
 from storetransactions import TransactionTracker
+from swapparser import parse_swap
+from contractaddress import parse_ca
 from env import BOT_TOKEN
 
 WEBHOOK_URL = "https://discord.com/api/webhooks/1331652748902535218/kuBKMyECNZpfa7M0Bx3egzk-bpLI0WXug4bz0MY5kYGFZrcupcnpvHZIpAM3i6IBiKaX"
@@ -40,15 +42,20 @@ async def track(interaction: discord.Interaction, ca: str):
         ]
     }
     
-    await bot.tracker.flag_token(ca, token_name, "")
+    # Trackers key tokens by canonical ContractAddress; the demo ids stay plain strings
+    key = parse_ca(ca) or ca
+    await bot.tracker.flag_token(key, token_name, "")
     
     # Process test descriptions if available
     if ca in test_descriptions:
         for desc in test_descriptions[ca]:
-            if "swapped" and "SOL for" in desc:
-                await bot.tracker.process_buy_transaction(ca, token_name, desc)
-            elif "for" and "SOL on" in desc:
-                await bot.tracker.process_sell_transaction(ca, token_name, desc)
+            swap = parse_swap(desc)
+            if swap is None:
+                continue
+            if swap.is_buy:
+                await bot.tracker.process_buy_transaction(key, token_name, desc, swap)
+            else:
+                await bot.tracker.process_sell_transaction(key, token_name, desc, swap)
     
     await interaction.followup.send(f"Started tracking {token_name} ({ca})")
 
@@ -56,8 +63,9 @@ async def track(interaction: discord.Interaction, ca: str):
 async def summary(interaction: discord.Interaction, ca: str):
     await interaction.response.defer()
     
-    if ca in bot.tracker.tracked_tokens:
-        token = bot.tracker.tracked_tokens[ca]
+    key = parse_ca(ca) or ca
+    if key in bot.tracker.tracked_tokens:
+        token = bot.tracker.tracked_tokens[key]
         embed = discord.Embed(title=f"Summary for {token['token_name']}")
         embed.add_field(name="Total Buys", value=f"{token['buy_amount']:.2f} SOL", inline=True)
         embed.add_field(name="Total Sells", value=f"{token['sell_amount']:.2f} SOL", inline=True)
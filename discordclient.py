@@ -0,0 +1,165 @@
+import asyncio
+import aiohttp
+import time
+from env import TOKEN
+
+
+DISCORD_API_URL = "https://discord.com/api/v10"
+MAX_MESSAGES_PER_FETCH = 100
+DISCORD_EPOCH_MS = 1420070400000
+
+
+def snowflake_key(message):
+    """Sort key for Discord messages - snowflake ids grow with creation time"""
+    return int(message['id'])
+
+
+def snowflake_time(message_id):
+    """Unix time (seconds) a message was created, decoded from its snowflake id"""
+    return ((int(message_id) >> 22) + DISCORD_EPOCH_MS) / 1000
+
+
+class RateLimitBucket:
+    """Request budget for one Discord rate limit bucket"""
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.remaining = None
+        self.reset_at = 0.0
+
+    def update(self, headers):
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        if remaining is not None:
+            self.remaining = int(remaining)
+        if reset_after is not None:
+            self.reset_at = time.monotonic() + float(reset_after)
+
+    def delay(self):
+        """Seconds to wait before this bucket may be used again"""
+        if self.remaining == 0:
+            return max(0.0, self.reset_at - time.monotonic())
+        return 0.0
+
+
+class DiscordClient:
+    """Shared REST client for every channel poller.
+
+    Owns the pooled aiohttp session and schedules all requests through
+    per-bucket budgets learned from Discord's X-RateLimit-* headers, so pollers
+    wait for their bucket to reset instead of burning cycles on 429s.
+    `base_url` can point at a local stub server for testing.
+    """
+    def __init__(self, base_url=DISCORD_API_URL, token=TOKEN, max_retries=3):
+        self.base_url = base_url
+        self.headers = {'authorization': token}
+        self.max_retries = max_retries
+        self.session = None
+
+        self.buckets = {}         # "<bucket hash>:<channel id>" -> RateLimitBucket
+        self.route_buckets = {}   # route -> bucket key reported by Discord
+        self.global_reset_at = 0.0
+
+        self.stats = {'requests': 0, 'rate_limited': 0}
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    def get_bucket(self, route, major_id):
+        # Until Discord tells us the bucket hash, each route gets its own bucket
+        key = self.route_buckets.get(route, route)
+        bucket_key = f"{key}:{major_id}"
+        if bucket_key not in self.buckets:
+            self.buckets[bucket_key] = RateLimitBucket()
+        return self.buckets[bucket_key]
+
+    async def request(self, method, route, major_id, params=None):
+        """Send one request through its rate limit bucket. Returns (status, json)"""
+        url = self.base_url + route.format(major_id)
+
+        for attempt in range(self.max_retries + 1):
+            bucket = self.get_bucket(route, major_id)
+            async with bucket.lock:
+                global_wait = self.global_reset_at - time.monotonic()
+                if global_wait > 0:
+                    await asyncio.sleep(global_wait)
+                bucket_wait = bucket.delay()
+                if bucket_wait > 0:
+                    await asyncio.sleep(bucket_wait)
+
+                self.stats['requests'] += 1
+                async with self.session.request(method, url, headers=self.headers, params=params) as response:
+                    bucket_hash = response.headers.get('X-RateLimit-Bucket')
+                    if bucket_hash and self.route_buckets.get(route) != bucket_hash:
+                        self.route_buckets[route] = bucket_hash
+                        bucket = self.get_bucket(route, major_id)
+                    bucket.update(response.headers)
+
+                    if response.status == 429:
+                        self.stats['rate_limited'] += 1
+                        retry_after = float(response.headers.get('Retry-After', 1))
+                        if response.headers.get('X-RateLimit-Global'):
+                            self.global_reset_at = time.monotonic() + retry_after
+                        else:
+                            bucket.remaining = 0
+                            bucket.reset_at = max(bucket.reset_at, time.monotonic() + retry_after)
+                        print(f"[RATE LIMIT] {route.format(major_id)} - retrying in {retry_after:.2f}s "
+                              f"(attempt {attempt + 1}/{self.max_retries + 1})")
+                        continue
+
+                    if response.status != 200:
+                        return response.status, None
+                    return 200, await response.json()
+
+        return 429, None
+
+    async def fetch_new_messages(self, channel_id, cursors, limit=MAX_MESSAGES_PER_FETCH):
+        """Fetch every message posted after the channel's cursor in a single request.
+
+        `cursors` maps channel_id -> last seen message id and is advanced in place.
+        Without a cursor only the latest message is returned, matching the old
+        messages[0] behaviour on a fresh start. Messages come back oldest first so
+        callers can process them in order. Returns (status, messages).
+        """
+        after = cursors.get(channel_id)
+        params = {'limit': limit, 'after': after} if after else {'limit': 1}
+
+        status, messages = await self.request('GET', '/channels/{}/messages', channel_id, params=params)
+        if status != 200 or not messages:
+            return status, []
+
+        messages.sort(key=snowflake_key)
+        cursors[channel_id] = messages[-1]['id']
+        return 200, messages
+
+    async def fetch_messages_since(self, channel_id, after, limit=MAX_MESSAGES_PER_FETCH):
+        """Page through every message posted after `after`, oldest first.
+
+        Used to backfill the gap left by a restart. Returns (status, messages);
+        on an error the messages fetched so far are still returned.
+        """
+        messages = []
+        while True:
+            status, page = await self.request('GET', '/channels/{}/messages', channel_id,
+                                              params={'limit': limit, 'after': after})
+            if status != 200:
+                return status, messages
+            if not page:
+                return 200, messages
+
+            page.sort(key=snowflake_key)
+            messages.extend(page)
+            after = page[-1]['id']
+            if len(page) < limit:
+                return 200, messages
@@ -0,0 +1,148 @@
+import asyncio
+import aiohttp
+import os
+import random
+from env import TOKEN
+
+
+DISCORD_GATEWAY_URL = "wss://gateway.discord.gg/?v=10&encoding=json"
+INGESTION_MODE = os.getenv('INGESTION_MODE', 'poll')  # 'poll' or 'gateway'
+
+# Gateway opcodes
+DISPATCH = 0
+HEARTBEAT = 1
+IDENTIFY = 2
+RESUME = 6
+RECONNECT = 7
+INVALID_SESSION = 9
+HELLO = 10
+HEARTBEAT_ACK = 11
+
+GUILD_MESSAGES = 1 << 9
+MESSAGE_CONTENT = 1 << 15
+
+
+class GatewayClient:
+    """Push-based alternative to REST polling.
+
+    Consumes MESSAGE_CREATE events over the Discord gateway websocket and hands
+    each message to the same processors the pollers use. `handlers` maps
+    channel_id -> (processor, extra_args); processors are called as
+    processor(session, message, *extra_args). `gateway_url` can point at a
+    local stub websocket server for testing.
+    """
+    def __init__(self, session, handlers, cursors=None, gateway_url=DISCORD_GATEWAY_URL, token=TOKEN):
+        self.session = session
+        self.handlers = handlers
+        self.cursors = cursors if cursors is not None else {}
+        self.gateway_url = gateway_url
+        self.token = token
+
+        self.sequence = None
+        self.session_id = None
+        self.resume_url = None
+        self.heartbeat_acked = True
+
+    async def run(self):
+        """Stay connected forever, resuming the session after drops where possible"""
+        while True:
+            try:
+                await self.connect()
+            except Exception as e:
+                print(f"[ERROR] Gateway connection error: {str(e)}")
+            await asyncio.sleep(5)
+
+    async def connect(self):
+        url = self.resume_url or self.gateway_url
+        async with self.session.ws_connect(url, heartbeat=None) as ws:
+            hello = await ws.receive_json()
+            if hello.get('op') != HELLO:
+                print(f"[ERROR] Expected HELLO from gateway, got op {hello.get('op')}")
+                return
+
+            interval = hello['d']['heartbeat_interval'] / 1000
+            self.heartbeat_acked = True
+            heartbeat_task = asyncio.create_task(self.heartbeat(ws, interval))
+            try:
+                if self.session_id and self.sequence is not None:
+                    await ws.send_json({
+                        'op': RESUME,
+                        'd': {'token': self.token, 'session_id': self.session_id, 'seq': self.sequence}
+                    })
+                else:
+                    await self.identify(ws)
+
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    if not await self.handle_payload(ws, msg.json()):
+                        break
+            finally:
+                heartbeat_task.cancel()
+
+    async def identify(self, ws):
+        await ws.send_json({
+            'op': IDENTIFY,
+            'd': {
+                'token': self.token,
+                'intents': GUILD_MESSAGES | MESSAGE_CONTENT,
+                'properties': {'os': 'linux', 'browser': 'MA-Bot', 'device': 'MA-Bot'}
+            }
+        })
+
+    async def heartbeat(self, ws, interval):
+        # First beat is jittered as the gateway docs ask
+        await asyncio.sleep(interval * random.random())
+        while not ws.closed:
+            if not self.heartbeat_acked:
+                print("[ERROR] Gateway heartbeat not acknowledged, reconnecting")
+                await ws.close()
+                return
+            self.heartbeat_acked = False
+            await ws.send_json({'op': HEARTBEAT, 'd': self.sequence})
+            await asyncio.sleep(interval)
+
+    async def handle_payload(self, ws, payload):
+        """Handle one gateway payload. Returns False when the connection should be dropped"""
+        op = payload.get('op')
+        if payload.get('s') is not None:
+            self.sequence = payload['s']
+
+        if op == DISPATCH:
+            event = payload.get('t')
+            data = payload.get('d') or {}
+            if event == 'READY':
+                self.session_id = data.get('session_id')
+                resume_url = data.get('resume_gateway_url')
+                self.resume_url = f"{resume_url}/?v=10&encoding=json" if resume_url else None
+                print("Gateway connected, waiting for messages...")
+            elif event == 'MESSAGE_CREATE':
+                await self.dispatch_message(data)
+        elif op == HEARTBEAT:
+            await ws.send_json({'op': HEARTBEAT, 'd': self.sequence})
+        elif op == HEARTBEAT_ACK:
+            self.heartbeat_acked = True
+        elif op == RECONNECT:
+            return False
+        elif op == INVALID_SESSION:
+            if not payload.get('d'):
+                self.session_id = None
+                self.sequence = None
+                self.resume_url = None
+            return False
+        return True
+
+    async def dispatch_message(self, message):
+        channel_id = message.get('channel_id')
+        if channel_id not in self.handlers:
+            return
+
+        cursor = self.cursors.get(channel_id)
+        if cursor is None or int(message['id']) > int(cursor):
+            self.cursors[channel_id] = message['id']
+
+        processor, args = self.handlers[channel_id]
+        try:
+            await processor(self.session, message, *args)
+        except Exception as e:
+            print(f"[ERROR] Exception handling gateway message in channel {channel_id}: {str(e)}")
@@ -0,0 +1,141 @@
+import re
+from collections import OrderedDict
+from swapparser import parse_swap
+from contractaddress import parse_ca, WRAPPED_SOL
+
+
+class EmbedSchema:
+    """Where one channel type keeps its values inside a message embed.
+
+    `fields` maps a normalized field name to a result key and `contains`
+    does the same for names that only need to include the text. With
+    `token_field_excludes` set (SWT style) the first field whose name is not
+    excluded and whose value is a CA is the token: its name is the token name,
+    its value the CA. `description_patterns` pull keys out of the embed
+    description. A 'ca' result is always a ContractAddress (never wrapped SOL)
+    and is left out when the text isn't a valid address.
+    """
+    def __init__(self, fields=None, contains=None, token_field_excludes=None,
+                 description_patterns=None, parse_swaps=False):
+        self.fields = fields or {}
+        self.contains = contains or {}
+        self.token_field_excludes = token_field_excludes
+        self.description_patterns = description_patterns or {}
+        self.parse_swaps = parse_swaps
+
+
+SCHEMAS = {
+    'swt': EmbedSchema(
+        token_field_excludes={'sol', 'useful links', 'buy with bonkbot', 'token address'},
+        parse_swaps=True
+    ),
+    'fresh': EmbedSchema(
+        fields={'token address:': 'ca'},
+        parse_swaps=True
+    ),
+    'multi_alert': EmbedSchema(
+        fields={
+            'ca': 'ca',
+            'token name': 'token_name',
+            'telegram link': 'telegram_link',
+            'twitter link': 'twitter_link'
+        },
+        contains={'buy amounts': 'buy_amounts'}
+    ),
+    '2x': EmbedSchema(
+        description_patterns={'ca': re.compile(r'ca:\s*`([^`]+)`', re.IGNORECASE)}
+    ),
+}
+
+
+def index_fields(embed):
+    """Normalized field name -> stripped value. The first field with a name wins"""
+    index = {}
+    for field in embed.get('fields', []):
+        name = field.get('name', '').strip().lower()
+        if name not in index:
+            index[name] = field.get('value', '').strip()
+    return index
+
+
+class EmbedParser:
+    """Parses each message's first embed once per schema and remembers the result.
+
+    Results are cached by message id (and edit timestamp), so the pipeline's
+    CA lookup, the channel processor and a later backfill or replay of the same
+    message all share one parse. Parsed results are plain dicts that callers
+    must not modify.
+    """
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, message, schema_name):
+        """Returns the parsed embed as a dict, or None when the message has no embeds"""
+        key = (message.get('id'), message.get('edited_timestamp'), schema_name)
+        if key[0] is not None:
+            parsed = self.cache.get(key)
+            if parsed is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return parsed
+
+        self.misses += 1
+        parsed = self.parse_embed(message, SCHEMAS[schema_name])
+        if parsed is not None and key[0] is not None:
+            self.cache[key] = parsed
+            if len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+        return parsed
+
+    def parse_embed(self, message, schema):
+        embeds = message.get('embeds', [])
+        if not embeds:
+            return None
+        embed = embeds[0]
+
+        fields = index_fields(embed)
+        description = embed.get('description', '')
+        parsed = {
+            'title': embed.get('title', ''),
+            'description': description,
+            'fields': fields
+        }
+
+        for name, key in schema.fields.items():
+            if name in fields:
+                parsed[key] = fields[name]
+        if schema.contains:
+            for name, value in fields.items():
+                for text, key in schema.contains.items():
+                    if text in name and key not in parsed:
+                        parsed[key] = value
+
+        if schema.token_field_excludes is not None:
+            for name, value in fields.items():
+                if name in schema.token_field_excludes:
+                    continue
+                ca = parse_ca(value)
+                if ca and ca is not WRAPPED_SOL:
+                    parsed['token_name'] = name
+                    parsed['ca'] = ca
+                    break
+
+        for key, pattern in schema.description_patterns.items():
+            match = pattern.search(description)
+            if match:
+                parsed[key] = match.group(1)
+
+        if 'ca' in parsed:
+            ca = parse_ca(parsed.pop('ca'))
+            if ca and ca is not WRAPPED_SOL:
+                parsed['ca'] = ca
+
+        if schema.parse_swaps:
+            parsed['swap'] = parse_swap(description)
+        return parsed
+
+
+embed_parser = EmbedParser()
@@ -1,13 +1,18 @@
 from datetime import datetime
 from typing import Dict, Tuple
 import os
-import re
+from swapparser import parse_swap
+from contractaddress import parse_ca
 
 class TokenTransactionTracker:
     def __init__(self):
         self.tracked_tokens: Dict[str, Dict] = {}
     
     def initialize_token(self, ca: str):
+        ca = parse_ca(ca)
+        if not ca:
+            print("\n❌ Invalid contract address")
+            return
         if ca not in self.tracked_tokens:
             self.tracked_tokens[ca] = {
                 'ca': ca,
@@ -17,42 +22,21 @@ class TokenTransactionTracker:
                 'sell_count': 0,
                 'first_seen': datetime.now()
             }
-            print(f"\n🎯 [TRACKING STARTED] Now tracking ({ca[:8]}...)")
+            print(f"\n🎯 [TRACKING STARTED] Now tracking ({ca:.8}...)")
             print("Watching for transactions...")
     
-    def extract_sol_amount(self, tx_description: str) -> Tuple[float, bool]:
-        description = tx_description.lower()
-
-        if description.split(" on ")[0].strip().endswith("sol"):
-            return 0, False
-        
-        if "swapped" not in description:
+    def extract_sol_amount(self, tx_description: str, swap=None) -> Tuple[float, bool]:
+        swap = swap or parse_swap(tx_description)
+        if swap is None:
             return 0, False
-        
-        if re.search(r'\sfor\s+[\d,.]+\s+sol\s', description):
-            try:
-                amount = float(re.search(r'\sfor\s+([\d,.]+)\s+sol\s', description).group(1))
-                return amount, False
-            except (AttributeError, ValueError):
-                return 0, False
-            
-        parts = description.split()
-        try:
-            for i, word in enumerate(parts):
-                if word == "swapped":
-                    next_word = parts[i + 1]
-                    if next_word.replace(".", "").isdigit() and parts[i + 2] == "sol":
-                        return float(next_word), True
-        except (IndexError, ValueError):
-            pass
-            
-        return 0, False
+        return swap.sol_amount, swap.is_buy
     
-    async def process_transaction(self, ca: str, tx_description: str, channel: str):
+    async def process_transaction(self, ca: str, tx_description: str, channel: str, swap=None):
+        ca = parse_ca(ca)
         if ca not in self.tracked_tokens:
             return
         
-        amount, is_buy = self.extract_sol_amount(tx_description)
+        amount, is_buy = self.extract_sol_amount(tx_description, swap)
         if amount == 0:
             return
         
@@ -60,7 +44,7 @@ class TokenTransactionTracker:
         timestamp = datetime.now().strftime('%H:%M:%S')
 
         if is_buy:
-            print(f"\n💚 [{timestamp}] BUY | {ca[:8]}... | {amount:.2f} SOL | {channel}")
+            print(f"\n💚 [{timestamp}] BUY | {ca:.8}... | {amount:.2f} SOL | {channel}")
             print(f"📝 {tx_description}")
             token_data['buys'].append({
                 'amount': amount,
@@ -70,7 +54,7 @@ class TokenTransactionTracker:
             })
             token_data['buy_count'] += 1
         else:  # This is a sell
-            print(f"\n❌ [{timestamp}] SELL | {ca[:8]}... | {amount:.2f} SOL | {channel}")
+            print(f"\n❌ [{timestamp}] SELL | {ca:.8}... | {amount:.2f} SOL | {channel}")
             print(f"📝 {tx_description}")
             token_data['sells'].append({
                 'amount': amount,
@@ -81,6 +65,7 @@ class TokenTransactionTracker:
             token_data['sell_count'] += 1
 
     async def display_stats(self, ca: str):
+        ca = parse_ca(ca)
         if ca not in self.tracked_tokens:
             return
         
@@ -88,7 +73,7 @@ class TokenTransactionTracker:
         tracking_duration = datetime.now() - token['first_seen']
         hours = tracking_duration.total_seconds() / 3600
 
-        print(f"\n📊 === Token Stats for {ca[:8]}... ===")
+        print(f"\n📊 === Token Stats for {ca:.8}... ===")
         print(f"⏰ Tracking Duration: {tracking_duration.seconds // 3600}h {(tracking_duration.seconds % 3600) // 60}m")
         print("\n📈 Transaction Summary:")
         print(f"💚 Total Buys: {token['buy_count']}")
@@ -100,9 +85,10 @@ class TokenTransactionTracker:
             print(f"📉 Sell Rate: {token['sell_count'] / hours:.1f} trades/hour")
 
     def stop_tracking(self, ca: str):
+        ca = parse_ca(ca)
         if ca in self.tracked_tokens:
             del self.tracked_tokens[ca]
-            print(f"\n🛑 [STOPPED] No longer tracking {ca[:8]}...")
+            print(f"\n🛑 [STOPPED] No longer tracking {ca:.8}...")
 
     async def list_tracked_tokens(self):
         if not self.tracked_tokens:
@@ -112,7 +98,7 @@ class TokenTransactionTracker:
         print("\n📋 Currently Tracked Tokens:")
         for ca, data in self.tracked_tokens.items():
             # First line shows CA and counts
-            print(f"🔍 {ca[:8]}... | Buys: {data['buy_count']} | Sells: {data['sell_count']}")
+            print(f"🔍 {ca:.8}... | Buys: {data['buy_count']} | Sells: {data['sell_count']}")
             
             # Show buy amounts if any exist
             if data['buys']:
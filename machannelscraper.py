@@ -5,49 +5,35 @@ import re
 import time
 from datetime import datetime
 import os
-from env import TOKEN
 from TGScraper import main as telegram_main
+from dedup import BoundedDedup
+from embedfields import embed_parser
+
 class ADScraper:
     def __init__(self):
-        self.url = "https://discord.com/api/v10/channels/{}/messages"
         self.last_message_ids = {}
-        self.processed_messages = set()        
+        self.processed_messages = BoundedDedup(snowflake=True)
         self.reset_values()
 
     def reset_values(self):
         self.ca = None
 
 
-    def normalize(self, ca: str) -> str:
-        return ca.strip().lower().replace('`', '')
-        
             
-    async def fetch_ma_messages(self, session, channel_id, channel_name):
-        headers = {'authorization': TOKEN}
-
-        url = self.url.format(channel_id)
-
+    async def fetch_ma_messages(self, discord, channel_id, channel_name):
         while True:
             try:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        messages = await response.json()
-                        if messages:
-                            latest_message = messages[0]
-                            message_id = latest_message['id']
-                            #print(f"Latest message ID: {message_id}")  # Debug line
-                            #print(f"Processed messages count: {len(self.processed_messages)}")  # Debug line
-                            
-                            if message_id not in self.processed_messages:
-                                print(f"New message detected! Processing...")  # Debug line
-                                self.processed_messages.add(message_id)
-                                await self.process_ma_messages(session, latest_message, channel_name)
-                            else:
-                                print("")  # Debug line
-                        else:
-                            print("No messages returned from API")  # Debug line
-                    else:
-                        print(f"Error Failed to fetch messages from {channel_name}")
+                status, messages = await discord.fetch_new_messages(channel_id, self.last_message_ids)
+                if status == 200:
+                    for message in messages:
+                        message_id = message['id']
+                        #print(f"Processed messages count: {len(self.processed_messages)}")  # Debug line
+                        if message_id not in self.processed_messages:
+                            print(f"New message detected! Processing...")  # Debug line
+                            self.processed_messages.add(message_id)
+                            await self.process_ma_messages(discord.session, message, channel_name)
+                else:
+                    print(f"Error Failed to fetch messages from {channel_name}")
                 await asyncio.sleep(7)  # Reduced sleep time to be more responsive
             except Exception as e:
                 print(f"Error in fetch_ma_messages: {str(e)}")
@@ -57,24 +43,18 @@ class ADScraper:
         try:
             self.reset_values()
 
-            embeds = message.get('embeds', [])
-            if not embeds:
+            parsed = embed_parser.parse(message, 'multi_alert')
+            if parsed is None:
                 print(f"No embeds found for MA Channel")
                 return
-            
-            embed = embeds[0]
 
-            title = embed.get('title', '').lower()
+            title = parsed['title'].lower()
             if not title:
                 print(f"No title found")
                 return
             
-            fields = embed.get('fields', [])
-            for field in fields:
-                token_fields = field.get('name', '').strip().lower()
-                if token_fields == "ca":
-                    ca = self.normalize(field.get('value', ''))
-                    if ca:
-                        await telegram_main(ca)
+            ca = parsed.get('ca')
+            if ca:
+                await telegram_main(str(ca))
         except Exception as e:
             print(str(e))
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+from collections import deque
+from embedfields import embed_parser
+
+
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', 8))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 1000))
+
+
+def message_key(message, schema, fallback):
+    """Pipeline key for a message: its CA when the embed has one (warming the embed cache for the processor), else `fallback`"""
+    parsed = embed_parser.parse(message, schema)
+    return (parsed.get('ca') if parsed else None) or fallback
+
+
+class EventPipeline:
+    """Per-key mailboxes between message fetching and processing.
+
+    Every key (the contract address) is an actor: events are appended to its
+    mailbox and a single task drains it in arrival order, so one token's events
+    never interleave while different tokens run in parallel. The actor exists
+    only while its mailbox has events. At most `workers` events are processed
+    at once; an actor only holds a slot while one of its events is running, so
+    a busy token can't tie up slots waiting on itself. Pollers `put` and return
+    to polling right away, and wait once `maxsize` events are pending so
+    fetching backs off.
+    """
+    def __init__(self, workers=PIPELINE_WORKERS, maxsize=PIPELINE_QUEUE_SIZE):
+        self.worker_count = workers
+        self.maxsize = maxsize
+        self.slots = None
+        self.capacity = None
+        self.idle = None
+
+        self.mailboxes = {}   # key -> deque of (processor, args, queued_at)
+        self.actors = {}      # key -> task draining that mailbox
+        self.pending = 0
+
+        self.processed = 0
+        self.max_depth = 0
+        self.max_mailbox = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def start(self):
+        # Created here so they belong to the running event loop
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.worker_count)
+            self.capacity = asyncio.Semaphore(self.maxsize)
+            self.idle = asyncio.Event()
+            self.idle.set()
+
+    async def stop(self):
+        tasks = list(self.actors.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.actors.clear()
+        self.mailboxes.clear()
+        self.pending = 0
+        if self.idle:
+            self.idle.set()
+
+    async def put(self, key, processor, *args):
+        """Queue processor(*args) on `key`'s mailbox. Waits when the pipeline is full"""
+        self.start()
+        await self.capacity.acquire()
+        mailbox = self.mailboxes.get(key)
+        if mailbox is None:
+            mailbox = self.mailboxes[key] = deque()
+            self.actors[key] = asyncio.create_task(self.actor(key, mailbox))
+        mailbox.append((processor, args, time.monotonic()))
+
+        self.pending += 1
+        self.idle.clear()
+        self.max_depth = max(self.max_depth, self.pending)
+        self.max_mailbox = max(self.max_mailbox, len(mailbox))
+
+    async def actor(self, key, mailbox):
+        try:
+            while mailbox:
+                processor, args, queued_at = mailbox.popleft()
+                try:
+                    async with self.slots:
+                        wait = time.monotonic() - queued_at
+                        self.total_wait += wait
+                        self.max_wait = max(self.max_wait, wait)
+                        await processor(*args)
+                except Exception as e:
+                    print(f"[ERROR] Pipeline worker failed processing event for {key}: {str(e)}")
+                finally:
+                    self.processed += 1
+                    self.pending -= 1
+                    self.capacity.release()
+                    if not self.pending:
+                        self.idle.set()
+        finally:
+            # Nothing awaits between the empty check and here, so no event can slip in unseen
+            if self.mailboxes.get(key) is mailbox:
+                del self.mailboxes[key]
+                del self.actors[key]
+
+    async def join(self):
+        """Wait until every queued event has been processed"""
+        if self.idle:
+            await self.idle.wait()
+
+    def metrics(self):
+        return {
+            'queue_depth': self.pending,
+            'max_queue_depth': self.max_depth,
+            'max_mailbox_depth': self.max_mailbox,
+            'processed': self.processed,
+            'avg_wait_seconds': self.total_wait / self.processed if self.processed else 0.0,
+            'max_wait_seconds': self.max_wait,
+            'active_keys': len(self.mailboxes)
+        }
+
+    async def log_metrics(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            m = self.metrics()
+            print(f"[PIPELINE] depth={m['queue_depth']} max_depth={m['max_queue_depth']} "
+                  f"keys={m['active_keys']} max_mailbox={m['max_mailbox_depth']} "
+                  f"processed={m['processed']} avg_wait={m['avg_wait_seconds']:.2f}s "
+                  f"max_wait={m['max_wait_seconds']:.2f}s")
@@ -0,0 +1,125 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+
+
+MARKET_DATA_REQUESTS_PER_MINUTE = float(os.getenv('MARKET_DATA_REQUESTS_PER_MINUTE', 300))
+MARKET_DATA_BURST = float(os.getenv('MARKET_DATA_BURST', 10))
+
+# Priority classes, served strictly in this order
+PRIORITIES = ('alert', 'interval', 'background')
+
+
+class PriorityRateLimiter:
+    """Token bucket shared by every market-data request, handed out by priority.
+
+    Holds up to `burst` tokens, refilled at `rate` per second, and each request
+    takes one. When none is free callers queue, and the next token goes to the
+    best priority waiting (see PRIORITIES), oldest first within a class, so an
+    alert lookup never waits behind a background poll. `block(seconds)` empties
+    the bucket and holds every class that long, for an upstream 429's
+    Retry-After.
+    """
+    def __init__(self, rate=MARKET_DATA_REQUESTS_PER_MINUTE / 60, burst=MARKET_DATA_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+        self.waiters = []   # heap of (priority rank, sequence, future, queued_at)
+        self.sequence = itertools.count()
+        self.dispatcher = None
+
+        self.rate_limited = 0
+        self.stats = {priority: {'granted': 0, 'total_wait': 0.0, 'max_wait': 0.0} for priority in PRIORITIES}
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def record(self, priority, wait):
+        stats = self.stats[priority]
+        stats['granted'] += 1
+        stats['total_wait'] += wait
+        stats['max_wait'] = max(stats['max_wait'], wait)
+
+    async def acquire(self, priority='alert'):
+        """Wait for a request token. `priority` is one of PRIORITIES"""
+        rank = PRIORITIES.index(priority)
+        now = time.monotonic()
+        self.refill(now)
+        if not self.waiters and now >= self.blocked_until and self.tokens >= 1:
+            self.tokens -= 1
+            self.record(priority, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (rank, next(self.sequence), future, now))
+        if self.dispatcher is None:
+            self.dispatcher = asyncio.create_task(self.dispatch())
+        # A cancelled waiter's future is cancelled with it and skipped by dispatch()
+        await future
+
+    async def dispatch(self):
+        try:
+            while self.waiters:
+                now = time.monotonic()
+                self.refill(now)
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                # Picked after the sleep, so a better priority that queued meanwhile goes first
+                rank, _, future, queued_at = heapq.heappop(self.waiters)
+                if future.done():
+                    continue
+                self.tokens -= 1
+                self.record(PRIORITIES[rank], now - queued_at)
+                future.set_result(None)
+        finally:
+            self.dispatcher = None
+
+    def block(self, seconds):
+        """Hold every request for `seconds`, e.g. after a 429 with Retry-After"""
+        now = time.monotonic()
+        self.refill(now)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.rate_limited += 1
+
+    def metrics(self):
+        self.refill(time.monotonic())
+        waiting = dict.fromkeys(PRIORITIES, 0)
+        for rank, _, future, _ in self.waiters:
+            if not future.done():
+                waiting[PRIORITIES[rank]] += 1
+        return {
+            'tokens_available': self.tokens,
+            'blocked_seconds': max(self.blocked_until - time.monotonic(), 0.0),
+            'rate_limited': self.rate_limited,
+            'classes': {
+                priority: {
+                    'waiting': waiting[priority],
+                    'granted': stats['granted'],
+                    'avg_wait_seconds': stats['total_wait'] / stats['granted'] if stats['granted'] else 0.0,
+                    'max_wait_seconds': stats['max_wait']
+                }
+                for priority, stats in self.stats.items()
+            }
+        }
+
+    async def log_metrics(self, interval=300):
+        while True:
+            await asyncio.sleep(interval)
+            m = self.metrics()
+            print(f"[LIMITER] tokens={m['tokens_available']:.1f} blocked={m['blocked_seconds']:.1f}s "
+                  f"rate_limited={m['rate_limited']}")
+            for priority, c in m['classes'].items():
+                print(f"[LIMITER] {priority}: waiting={c['waiting']} granted={c['granted']} "
+                      f"avg_wait={c['avg_wait_seconds']:.2f}s max_wait={c['max_wait_seconds']:.2f}s")
+
+
+market_data_limiter = PriorityRateLimiter()
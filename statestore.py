@@ -0,0 +1,132 @@
+import asyncio
+import gc
+import os
+import pickle
+import time
+
+
+STATE_PATH = os.getenv('STATE_PATH', 'scraper_state')
+
+
+class StateStore:
+    """Persists per-CA tracker state as a compact snapshot plus an append-only log.
+
+    Owners call `mark(ca)` whenever a CA's state changes. Each flush asks
+    `export_ca(ca)` for a copy of every marked CA (None once nothing is kept for
+    it) and appends the batch to the log; every `snapshot_interval` seconds, or
+    once the log holds `max_log_records` records, all CAs from `known_cas()` are
+    written to a fresh snapshot and the log starts over. Copies are taken on
+    the event loop so they are consistent; pickling and file I/O run in a
+    worker thread.
+
+    `load()` reads the snapshot and replays the log over it (later records
+    replace earlier ones). A torn record at the end of the log is ignored.
+    """
+    def __init__(self, export_ca, import_ca, known_cas, path=STATE_PATH, snapshot_interval=600, max_log_records=50000):
+        self.export_ca = export_ca
+        self.import_ca = import_ca
+        self.known_cas = known_cas
+        self.snapshot_path = f"{path}.snapshot"
+        self.log_path = f"{path}.log"
+        self.snapshot_interval = snapshot_interval
+        self.max_log_records = max_log_records
+        self.dirty = set()
+        self.log_records = 0
+        self.last_snapshot = time.monotonic()
+
+    def mark(self, ca):
+        self.dirty.add(ca)
+
+    def load(self):
+        """ca -> state as of the last flush, or {} when nothing was saved"""
+        states = {}
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                states = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading state snapshot: {e}")
+
+        try:
+            with open(self.log_path, 'rb') as f:
+                while True:
+                    try:
+                        batch = pickle.load(f)
+                    except EOFError:
+                        break
+                    except Exception as e:
+                        print(f"Ignoring truncated state log record: {e}")
+                        break
+                    for ca, state in batch:
+                        if state is None:
+                            states.pop(ca, None)
+                        else:
+                            states[ca] = state
+                    self.log_records += len(batch)
+        except FileNotFoundError:
+            pass
+        return states
+
+    def restore(self):
+        """Load the saved state and hand each CA's record to `import_ca`. Returns the number restored"""
+        started = time.perf_counter()
+        # Nothing restored here is garbage, so skip the collector passes the
+        # many new containers would otherwise trigger
+        gc.disable()
+        try:
+            states = self.load()
+            for ca, state in states.items():
+                try:
+                    self.import_ca(ca, state)
+                except Exception as e:
+                    print(f"Error restoring state for {ca}: {e}")
+        finally:
+            gc.enable()
+        if states:
+            print(f"Restored state for {len(states)} tokens in {time.perf_counter() - started:.2f}s")
+        return len(states)
+
+    def write_log(self, batch):
+        with open(self.log_path, 'ab') as f:
+            pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def write_snapshot(self, states):
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(states, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        # Everything in the log is covered by the snapshot now
+        open(self.log_path, 'wb').close()
+
+    async def flush(self):
+        snapshot_due = (time.monotonic() - self.last_snapshot >= self.snapshot_interval
+                        or self.log_records >= self.max_log_records)
+        marked, self.dirty = self.dirty, set()
+        try:
+            if snapshot_due:
+                states = {}
+                for ca in self.known_cas():
+                    state = self.export_ca(ca)
+                    if state is not None:
+                        states[ca] = state
+                await asyncio.to_thread(self.write_snapshot, states)
+                self.log_records = 0
+                self.last_snapshot = time.monotonic()
+            elif marked:
+                batch = [(ca, self.export_ca(ca)) for ca in marked]
+                await asyncio.to_thread(self.write_log, batch)
+                self.log_records += len(batch)
+        except Exception as e:
+            # Keep the changes so the next flush writes them again
+            self.dirty |= marked
+            print(f"Error saving scraper state: {e}")
+
+    async def flush_periodically(self, interval=1):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
@@ -1,115 +1,182 @@
 from datetime import datetime
 import os
-import re
+import time
 from typing import Dict, Tuple
 import asyncio, aiohttp
+from dedup import BoundedDedup
+from swapparser import parse_swap
+from descriptionstore import descriptions
+from alertrules import alert_rules
+from tradewindow import TradeRing, RollingSums, DecayedFlow
+from alertcoalescer import alert_coalescer
+
+
+# Recent trades kept per token for the webhooks (preallocated, so kept small)
+MAX_RECENT_TRANSACTIONS = 32
+
+# Half-lives (seconds) of the decayed buy/sell flow behind the BPI and sell pressure alerts
+BPI_HALF_LIFE = float(os.getenv('BPI_HALF_LIFE_SECONDS', 300))
+SELL_PRESSURE_HALF_LIFE = float(os.getenv('SELL_PRESSURE_HALF_LIFE_SECONDS', 300))
+HALF_LIVES = sorted({BPI_HALF_LIFE, SELL_PRESSURE_HALF_LIFE})
+
+# BPI fires when the decayed buy/sell ratio crosses up through BPI_RATIO and
+# re-arms once it falls back under BPI_REARM_RATIO
+BPI_RATIO = 2.0
+BPI_REARM_RATIO = 1.5
 
 
 class TransactionTracker:
     def __init__(self):
         self.tracked_tokens: Dict[str, Dict] = {}
-        self.processed_txs = set()
-        self.alerted_cas = set()
-        self.bpi_alerted_cas = {}
-        self.sell_pressure_alerted_cas = {}
+        self.processed_txs = BoundedDedup(max_entries=100000, ttl=24 * 3600)
+        # CAs whose BPI / sell pressure alert has fired and not re-armed yet
+        self.bpi_alerted_cas = set()
+        self.sell_pressure_alerted_cas = set()
 
         self.large_buys_wh = "https://discord.com/api/webhooks/1332066523681919017/Nk6tNc0Phlx9xNYtuBK_JIOskLnoBN7Jg_w3VOvqeCJVJTVz0xTqsiFlK28BdnxxqVl5"
         self.bpi_wh = "https://discord.com/api/webhooks/1332066601922596974/ml6KuhW1pMeKDLTVlZsrMSi0faWm386-UIOWSlJm5PB5j-vzkFRE62PauO8gkmrYefaV"
         self.sell_wh = "https://discord.com/api/webhooks/1332066657853505557/HXqQjdEdrTCwFH80yiQzeeBSgqnO4YWv9SdXE_Hkojj63XfvbGQy7MqCdeYhQxdNbK4_"
     
-    async def flag_token_as_large_buys(self, ca: str, token_name: str, tx_description: str):
+    def export_ca(self, ca):
+        """Copy of everything kept for `ca`, for the state store"""
+        token = self.tracked_tokens.get(ca)
+        if token is None:
+            return None
+        state = dict(token)
+        state['trades'] = [(timestamp, amount, is_buy, descriptions.get(description_id))
+                           for timestamp, amount, is_buy, description_id in token['trades']]
+        state['windows'] = token['windows'].export()
+        state['flows'] = [flow.export() for flow in token['flows'].values()]
+        state['bpi_alerted'] = ca in self.bpi_alerted_cas
+        state['sell_pressure_alerted'] = ca in self.sell_pressure_alerted_cas
+        return state
+
+    def import_ca(self, ca, state):
+        """Restore a record from `export_ca` (takes ownership of `state`)"""
+        bpi_alerted = state.pop('bpi_alerted')
+        sell_pressure_alerted = state.pop('sell_pressure_alerted')
+        trades = TradeRing(MAX_RECENT_TRANSACTIONS)
+        for timestamp, amount, is_buy, tx_description in state['trades']:
+            trades.append(timestamp, amount, is_buy, descriptions.add(tx_description))
+        self.processed_txs.update(tx_description for _, _, _, tx_description in state['trades'])
+        state['trades'] = trades
+        state['windows'] = RollingSums.restore(state['windows'])
+        flows = {half_life: DecayedFlow(half_life) for half_life in HALF_LIVES}
+        for half_life, buys, sells, updated_at in state['flows']:
+            if half_life in flows:
+                flows[half_life] = DecayedFlow(half_life, buys, sells, updated_at)
+        state['flows'] = flows
+        self.tracked_tokens[ca] = state
+        if bpi_alerted:
+            self.bpi_alerted_cas.add(ca)
+        if sell_pressure_alerted:
+            self.sell_pressure_alerted_cas.add(ca)
+
+    def forget(self, ca):
+        """Drop a token's record and alert flags, releasing its trades' descriptions"""
+        token = self.tracked_tokens.pop(ca, None)
+        if token:
+            for _, _, _, description_id in token['trades']:
+                descriptions.release(description_id)
+        self.bpi_alerted_cas.discard(ca)
+        self.sell_pressure_alerted_cas.discard(ca)
+
+    async def flag_token_as_large_buys(self, ca: str, token_name: str, tx_description: str, swap=None, timestamp=None):
         if tx_description in self.processed_txs:
             return
         self.processed_txs.add(tx_description)
+
+        swap = swap or parse_swap(tx_description)
         
         if ca not in self.tracked_tokens:
             self.tracked_tokens[ca] = {
                 'ca': ca,
                 'token_name': token_name,
-                'transactions': [],
+                'trades': TradeRing(MAX_RECENT_TRANSACTIONS),
+                'windows': RollingSums(),
+                'flows': {half_life: DecayedFlow(half_life) for half_life in HALF_LIVES},
                 'buy_amount': 0,
-                'sell_amount': 0,
-                'last_alerted_buy': 0,
-                'last_alerted_sell': 0
+                'sell_amount': 0
             }
             print(f"\nStarted Tracking {token_name}\nCA: |{ca}|")
 
-        self.tracked_tokens[ca]['transactions'].append(tx_description)
-        
-        if "swapped" in tx_description:
-            if "swapped" and "SOL for" in tx_description:
-                await self.add_buy_amount(ca, tx_description)
-                current_buys = self.tracked_tokens[ca]['buy_amount']
-                current_sells = self.tracked_tokens[ca]['sell_amount']
-                
-                if current_buys >= 30:
-                    if ca not in self.alerted_cas:
-                        self.alerted_cas.add(ca)
-                        self.tracked_tokens[ca]['last_alerted_buy'] = current_buys
-                        self.tracked_tokens[ca]['last_alerted_sell'] = current_sells
-                        await self.send_webhook(ca)
-                    elif current_buys >= 500:  # Check for high volume threshold
-                        if (abs(current_buys - self.tracked_tokens[ca]['last_alerted_buy']) >= 100 or 
-                            abs(current_sells - self.tracked_tokens[ca]['last_alerted_sell']) >= 100):
-                            self.tracked_tokens[ca]['last_alerted_buy'] = current_buys
-                            self.tracked_tokens[ca]['last_alerted_sell'] = current_sells
-                            await self.send_webhook(ca)
-                    else:  # For buys between 30 and 500
-                        if (abs(current_buys - self.tracked_tokens[ca]['last_alerted_buy']) >= 15 or 
-                            abs(current_sells - self.tracked_tokens[ca]['last_alerted_sell']) >= 15):
-                            self.tracked_tokens[ca]['last_alerted_buy'] = current_buys
-                            self.tracked_tokens[ca]['last_alerted_sell'] = current_sells
-                            await self.send_webhook(ca)
-
-                await self.check_ratio(ca)
-
-            elif "for" and "SOL on" in tx_description:
-                await self.add_sell_amount(ca, tx_description)
-                current_buys = self.tracked_tokens[ca]['buy_amount']
-                current_sells = self.tracked_tokens[ca]['sell_amount']
-                
-                if ca in self.alerted_cas and (abs(current_buys - self.tracked_tokens[ca]['last_alerted_buy']) >= 15 or 
-                                            abs(current_sells - self.tracked_tokens[ca]['last_alerted_sell']) >= 15):
-                    self.tracked_tokens[ca]['last_alerted_buy'] = current_buys
-                    self.tracked_tokens[ca]['last_alerted_sell'] = current_sells
-                    await self.send_webhook(ca)
-                await self.check_ratio(ca)
-                await self.check_sell_pressure(ca)
+        if swap:
+            self.record_transaction(ca, tx_description, swap, timestamp or time.time())
+
+            if swap.is_buy:
+                await self.add_buy_amount(ca, tx_description, swap.sol_amount)
+                await self.check_alert_rules(ca, 'buy_amount')
+
+            elif swap.is_sell:
+                await self.add_sell_amount(ca, tx_description, swap.sol_amount)
+                await self.check_alert_rules(ca, 'sell_amount')
+
+            # Either side can push the flow across a threshold or re-arm an alert
+            await self.check_ratio(ca)
+            await self.check_sell_pressure(ca)
         
+    async def check_alert_rules(self, ca, changed: str):
+        """Send the large buys webhook when one of the 'large_buys' rules fires for the amount that changed"""
+        if alert_rules.evaluate('large_buys', ca, self.tracked_tokens[ca], (changed,)):
+            await self.send_webhook(ca)
+
+    def record_transaction(self, ca, tx_description: str, swap, timestamp: float):
+        """Keep the trade in the token's ring and rolling windows; the ring's oldest description is released"""
+        token = self.tracked_tokens[ca]
+        evicted = token['trades'].append(timestamp, swap.sol_amount, swap.is_buy, descriptions.add(tx_description))
+        if evicted is not None:
+            descriptions.release(evicted)
+        token['windows'].add(timestamp, swap.sol_amount, swap.is_buy)
+        for flow in token['flows'].values():
+            flow.add(timestamp, swap.sol_amount, swap.is_buy)
+
+    def decayed_flow(self, ca, half_life):
+        """(buy SOL, sell SOL) for the token with each trade decayed by `half_life`"""
+        return self.tracked_tokens[ca]['flows'][half_life].value(time.time())
+
     async def calculate_buy_sell_ratio(self, ca: str) -> float:
         if ca in self.tracked_tokens:
-            token = self.tracked_tokens[ca]
-            if token['sell_amount'] > 0 and token["buy_amount"] > 0:
-                return token['buy_amount'] / token['sell_amount']
+            buys, sells = self.decayed_flow(ca, BPI_HALF_LIFE)
+            if sells > 0 and buys > 0:
+                return buys / sells
         return 0.0
     
     async def check_ratio(self, ca: str):
         ratio = await self.calculate_buy_sell_ratio(ca)
         min_buy_amount = 8.0
         min_sell_amount = 8.0
-        current_buys = self.tracked_tokens[ca]['buy_amount']
-        current_sells = self.tracked_tokens[ca]['sell_amount']
-
-        if ratio >= 2.0 and current_buys >= min_buy_amount and current_sells >= min_sell_amount: #2:1 ratio
-            if ca not in self.bpi_alerted_cas:
-                self.bpi_alerted_cas[ca] = (current_buys, current_sells)
-                await self.send_bpi_webhook(ca, ratio)
-            else:
-                last_buys, last_sells = self.bpi_alerted_cas[ca]
-                if current_buys >= last_buys * 2 and current_sells >= last_sells * 2:
-                    self.bpi_alerted_cas[ca] = (current_buys, current_sells)
-                    await self.send_bpi_webhook(ca, ratio)
+        current_buys, current_sells = self.decayed_flow(ca, BPI_HALF_LIFE)
+
+        if ca in self.bpi_alerted_cas:
+            if ratio < BPI_REARM_RATIO:
+                self.bpi_alerted_cas.discard(ca)
+        elif ratio >= BPI_RATIO and current_buys >= min_buy_amount and current_sells >= min_sell_amount:
+            self.bpi_alerted_cas.add(ca)
+            await self.send_bpi_webhook(ca, ratio)
+
+    def window_fields(self, ca):
+        """Embed fields with the token's buys and sells over each rolling window"""
+        windows = self.tracked_tokens[ca]['windows'].all(time.time())
+        return [
+            {
+                "name": f"Buys / Sells ({name})",
+                "value": f"`{buys:.2f}` / `{sells:.2f}` SOL",
+                "inline": True
+            }
+            for name, (buys, sells) in windows.items()
+        ]
 
     async def send_bpi_webhook(self, ca: str, ratio: float):
         if ca not in self.tracked_tokens:
             return
         token = self.tracked_tokens[ca]
+        buys, sells = self.decayed_flow(ca, BPI_HALF_LIFE)
 
         data = {
             "username": "BPI Detection Bot",
             "embeds": [{
                 "title": f"📈Heavy Buy Pressure Indicator📈 For: {token['token_name']}",
-                "description": f"Buy/Sell ratio of {ratio:.1f} detected",
+                "description": f"Buy/Sell ratio of {ratio:.1f} detected in the current flow",
                 "fields": [
                     {
                         "name": "Token Name",
@@ -122,16 +189,16 @@ class TransactionTracker:
                         "inline": False
                     },
                     {
-                        "name": "Total Buys:",
-                        "value": f"```{token['buy_amount']:.2f} SOL```",
+                        "name": f"Buy flow ({BPI_HALF_LIFE:.0f}s half-life):",
+                        "value": f"```{buys:.2f} SOL```",
                         "inline": False
                     },
                     {
-                        "name": "Total Sells",
-                        "value": f"```{token['sell_amount']:.2f} SOL```",
+                        "name": f"Sell flow ({BPI_HALF_LIFE:.0f}s half-life)",
+                        "value": f"```{sells:.2f} SOL```",
                         "inline": True
                     }
-                ]
+                ] + self.window_fields(ca)
             }]
         }
 
@@ -151,35 +218,17 @@ class TransactionTracker:
     #SELL Integration
     #----------------------------------------
 
-    async def process_sell_transaction(self, ca: str, token_name: str, tx_description: str):
-        await self.flag_token_as_large_buys(ca, token_name, tx_description)
+    async def process_sell_transaction(self, ca: str, token_name: str, tx_description: str, swap=None, timestamp=None):
+        await self.flag_token_as_large_buys(ca, token_name, tx_description, swap, timestamp)
         await self.update_sell_totals(ca)
 
-    
-    async def extract_sell_amounts(self, tx_description: str) -> float:
-        pattern = r'swapped .+? for ([\d,\.]+) SOL'  # More flexible pattern
-        match = re.search(pattern, tx_description)
-        print(f"Sell TX: {tx_description}")
-        if match:
-            try:
-                amount_str = match.group(1)
-                sell_amount = float(amount_str.replace(',', ''))
-                print(f"Extracted sell amount: {sell_amount}")
-                return sell_amount
-            except ValueError:
-                return 0.0
-        print(f"No match found - Pattern failed to match: {pattern}")
-        return 0.0
-        
-    async def add_sell_amount(self, ca: str, tx_description: str):
+    async def add_sell_amount(self, ca: str, tx_description: str, sell_amount: float):
         if ca in self.tracked_tokens:
-            sell_amount = await self.extract_sell_amounts(tx_description)
             if sell_amount > 0:
                 self.tracked_tokens[ca]['sell_amount'] += sell_amount
-                self.tracked_tokens[ca]['transactions'].append(tx_description)
 
                 print(f"New Sell of: {sell_amount} for {self.tracked_tokens[ca]['token_name']}")
-                print(f"New Transaction: {self.tracked_tokens[ca]['transactions']}")
+                print(f"New Transaction: {tx_description}")
 
         else:
             print(F"Token not being tracked")
@@ -192,29 +241,28 @@ class TransactionTracker:
 
     async def check_sell_pressure(self, ca: str):
         if ca in self.tracked_tokens:
-            token = self.tracked_tokens[ca]
-            current_buys = token['buy_amount']
-            current_sells = token['sell_amount']
+            current_buys, current_sells = self.decayed_flow(ca, SELL_PRESSURE_HALF_LIFE)
 
             threshold = current_buys + 10.0
             percentage_exceeded = ((current_sells - threshold) / threshold) * 100
             
-            if current_buys >= 10.0 and current_sells > current_buys + 10.0:
-                if ca not in self.sell_pressure_alerted_cas:
-                    self.sell_pressure_alerted_cas[ca] = percentage_exceeded
-                    await self.send_sell_pressure_webhook(ca, percentage_exceeded)
-                elif abs(percentage_exceeded - self.sell_pressure_alerted_cas[ca]) >= 20: #20% change in sell pressure
-                    self.sell_pressure_alerted_cas[ca] = percentage_exceeded
-                    await self.send_sell_pressure_webhook(ca, percentage_exceeded)
+            if ca in self.sell_pressure_alerted_cas:
+                # Re-arm once buying has caught back up with selling
+                if current_sells <= current_buys:
+                    self.sell_pressure_alerted_cas.discard(ca)
+            elif current_buys >= 10.0 and current_sells > current_buys + 10.0:
+                self.sell_pressure_alerted_cas.add(ca)
+                await self.send_sell_pressure_webhook(ca, percentage_exceeded)
     
     async def send_sell_pressure_webhook(self, ca: str, percentage_exceeded: float):
         token = self.tracked_tokens[ca]
+        buys, sells = self.decayed_flow(ca, SELL_PRESSURE_HALF_LIFE)
    
         data = {
             "username": "Sell Pressure Alert Bot",
             "embeds": [{
                 "title": f"📉 Sell Pressure Detected For: {token['token_name']}\n Sells outweight Buys by: {percentage_exceeded:.2f}%",
-                "description": "Token sells have exceeded buys",
+                "description": "Token sells have exceeded buys in the current flow",
                 "fields": [
                     {
                         "name": "Token Name",
@@ -227,16 +275,16 @@ class TransactionTracker:
                         "inline": False
                     },
                     {
-                        "name": "Total Buys",
-                        "value": f"`{token['buy_amount']:.2f}` SOL",
+                        "name": f"Buy flow ({SELL_PRESSURE_HALF_LIFE:.0f}s half-life)",
+                        "value": f"`{buys:.2f}` SOL",
                         "inline": True
                     },
                     {
-                        "name": "Total Sells",
-                        "value": f"`{token['sell_amount']:.2f}` SOL",
+                        "name": f"Sell flow ({SELL_PRESSURE_HALF_LIFE:.0f}s half-life)",
+                        "value": f"`{sells:.2f}` SOL",
                         "inline": True 
                     }
-                ]
+                ] + self.window_fields(ca)
             }]
         }
 
@@ -254,31 +302,17 @@ class TransactionTracker:
     #Buy Integration
 #----------------------------------------
 
-    async def process_buy_transaction(self, ca: str, token_name: str, tx_description: str):
-        await self.flag_token_as_large_buys(ca, token_name, tx_description)
+    async def process_buy_transaction(self, ca: str, token_name: str, tx_description: str, swap=None, timestamp=None):
+        await self.flag_token_as_large_buys(ca, token_name, tx_description, swap, timestamp)
         await self.update_buy_totals(ca)
 
-    
-    async def extract_buy_amounts(self, tx_description: str) -> float:
-        pattern = r'swapped ([\d,.]+) SOL for'  # Changed pattern to match buy transactions
-        match = re.search(pattern, tx_description)
-        if match:
-            try:
-                buy_amount = float(match.group(1).replace(',', ''))
-                return buy_amount
-            except ValueError:
-                return 0.0
-        return 0.0
-    
-    async def add_buy_amount(self, ca: str, tx_description: str):
+    async def add_buy_amount(self, ca: str, tx_description: str, buy_amount: float):
         if ca in self.tracked_tokens:
-            buy_amount = await self.extract_buy_amounts(tx_description)
             if buy_amount > 0:
                 self.tracked_tokens[ca]['buy_amount'] += buy_amount
-                self.tracked_tokens[ca]['transactions'].append(tx_description)
 
                 print(f"New Buy of: {buy_amount} for {self.tracked_tokens[ca]['token_name']}")
-                print(f"New Transaction: {self.tracked_tokens[ca]['transactions']}")
+                print(f"New Transaction: {tx_description}")
 
         else:
             print(F"Token not being tracked")
@@ -301,22 +335,18 @@ class TransactionTracker:
             print(f"{'=' * 30}")
 
     async def send_webhook(self, ca: str):
+        """Post the large buys alert, or update the token's live one (see AlertCoalescer)"""
         if ca not in self.tracked_tokens:
             return
-            
-        token = self.tracked_tokens[ca]
-        
-        buy_txs = []
-        sell_txs = []
-
-        for tx in token['transactions']:
-            if "swapped" and "SOL for" in tx:
-                buy_txs.append(tx)
-            elif "for" and "SOL on" in tx:
-                sell_txs.append(tx)
+        await alert_coalescer.publish(self.large_buys_wh, ('large_buys', ca), lambda: self.large_buys_payload(ca))
 
-        last_buys = buy_txs[-3:] if buy_txs else []
-        last_sells = sell_txs[-3:] if sell_txs else []
+    def large_buys_payload(self, ca: str):
+        token = self.tracked_tokens.get(ca)
+        if token is None:
+            return None   # Untracked before a pending update went out
+        
+        last_buys = [descriptions.get(description_id) for description_id in token['trades'].recent(True, 3)]
+        last_sells = [descriptions.get(description_id) for description_id in token['trades'].recent(False, 3)]
 
         tx_display = ""
         if last_buys:
@@ -354,16 +384,7 @@ class TransactionTracker:
                         "value": f"{token['sell_amount']:.2f} SOL",
                         "inline": True
                     }
-                ]
+                ] + self.window_fields(ca)
             }]
         }
-
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(self.large_buys_wh, json=data) as response:
-                    if response.status == 204:
-                        print("Webhook sent successfully")
-                    else:
-                        print(f"Failed to send webhook: {response.status}")
-            except Exception as e:
-                print(f"Error sending webhook: {str(e)}")
\ No newline at end of file
+        return data
@@ -0,0 +1,165 @@
+import re
+from dataclasses import dataclass
+
+
+SWAP_BODY = re.compile(
+    r'\s+\**([\d,]*\.?\d+)\**\s+(\S+)\s+for\s+\**([\d,]*\.?\d+)\**\s+(\S+)(?:\s+on\s+(\S+))?',
+    re.IGNORECASE
+)
+
+
+@dataclass(slots=True)
+class ParsedSwap:
+    """One parsed swap. Shared between handlers, so treat it as read-only"""
+    side: str            # 'buy' (SOL in) or 'sell' (SOL out)
+    sol_amount: float
+    token_amount: float
+    token_symbol: str
+    dex: str
+    wallet: str
+
+    @property
+    def is_buy(self):
+        return self.side == 'buy'
+
+    @property
+    def is_sell(self):
+        return self.side == 'sell'
+
+
+def parse_amount(text):
+    return float(text.replace(',', ''))
+
+
+def parse_swap(tx_description):
+    """Parse a tracker bot swap description once.
+
+    Returns a ParsedSwap for SOL buys ("swapped 1.5 SOL for 625,281.2 X on
+    Raydium") and SOL sells ("swapped 792,158.18 X for 2.47 SOL on Raydium"),
+    or None when the description is not a SOL swap.
+    """
+    if not tx_description:
+        return None
+    index = tx_description.find('swapped')
+    if index == -1:
+        index = tx_description.lower().find('swapped')
+        if index == -1:
+            return None
+    match = SWAP_BODY.match(tx_description, index + 7)
+    if not match:
+        return None
+
+    in_amount, in_symbol, out_amount, out_symbol, dex = match.groups()
+    in_symbol = in_symbol.strip('*')
+    out_symbol = out_symbol.strip('.*')
+    try:
+        if in_symbol.upper() == 'SOL':
+            side = 'buy'
+            sol_amount = parse_amount(in_amount)
+            token_amount = parse_amount(out_amount)
+            token_symbol = out_symbol
+        elif out_symbol.upper() == 'SOL':
+            side = 'sell'
+            sol_amount = parse_amount(out_amount)
+            token_amount = parse_amount(in_amount)
+            token_symbol = in_symbol
+        else:
+            return None
+    except ValueError:
+        return None
+
+    wallet = tx_description[:index].rstrip()
+    if wallet.endswith(' has') or wallet == 'has':
+        wallet = wallet[:-3]
+    if wallet.startswith('['):
+        # "[name](https://solscan.io/account/...)" -> "name"
+        end = wallet.find(']')
+        if end != -1:
+            wallet = wallet[1:end]
+    return ParsedSwap(side, sol_amount, token_amount, token_symbol, (dex or '').strip('.*'), wallet.strip(' *:-'))
+
+
+if __name__ == "__main__":
+    # Throughput benchmark against the ad-hoc parsers this module replaced
+    import timeit
+
+    def legacy_extract_sol_buy_amount(tx_description):
+        parts = tx_description.lower().split()
+        try:
+            for i, word in enumerate(parts):
+                if word == "swapped":
+                    next_word = parts[i + 1]
+                    try:
+                        if next_word.replace(".", "").isdigit() and parts[i + 2] == "sol":
+                            return float(next_word)
+                    except ValueError:
+                        continue
+        except IndexError:
+            return 0
+        return 0
+
+    def legacy_extract_buy_amounts(tx_description):
+        match = re.search(r'swapped ([\d,.]+) SOL for', tx_description)
+        if match:
+            try:
+                return float(match.group(1).replace(',', ''))
+            except ValueError:
+                return 0.0
+        return 0.0
+
+    def legacy_extract_sell_amounts(tx_description):
+        match = re.search(r'swapped .+? for ([\d,\.]+) SOL', tx_description)
+        if match:
+            try:
+                return float(match.group(1).replace(',', ''))
+            except ValueError:
+                return 0.0
+        return 0.0
+
+    def legacy_flagged_extract_sol_amount(tx_description):
+        description = tx_description.lower()
+        if description.split(" on ")[0].strip().endswith("sol"):
+            return 0, False
+        if "swapped" not in description:
+            return 0, False
+        if re.search(r'\sfor\s+[\d,.]+\s+sol\s', description):
+            try:
+                return float(re.search(r'\sfor\s+([\d,.]+)\s+sol\s', description).group(1)), False
+            except (AttributeError, ValueError):
+                return 0, False
+        parts = description.split()
+        try:
+            for i, word in enumerate(parts):
+                if word == "swapped":
+                    next_word = parts[i + 1]
+                    if next_word.replace(".", "").isdigit() and parts[i + 2] == "sol":
+                        return float(next_word), True
+        except (IndexError, ValueError):
+            pass
+        return 0, False
+
+    def legacy_pipeline(tx_description):
+        # What one message cost before: every module parsed the description itself
+        if "SOL for" in tx_description:
+            legacy_extract_buy_amounts(tx_description)
+        elif "SOL on" in tx_description:
+            legacy_extract_sell_amounts(tx_description)
+        legacy_extract_sol_buy_amount(tx_description)
+        legacy_flagged_extract_sol_amount(tx_description)
+
+    samples = [
+        "[Wallet](https://solscan.io/account/abc) has swapped 1.5 SOL for 625,281.2 TokenA on Raydium.",
+        "[Wallet](https://solscan.io/account/def) has swapped 792,158.18 TokenA for 2.47 SOL on Raydium.",
+        "Freshly funded wallet has swapped 11.09 SOL for 29,759,514.17 TokenB on Pump.fun",
+        "Whale swapped 1,204.5 SOL for 3,100,000 TokenC on Jupiter",
+    ]
+    for sample in samples:
+        print(parse_swap(sample))
+
+    number = 50000
+    legacy_time = timeit.timeit(lambda: [legacy_pipeline(s) for s in samples], number=number)
+    parser_time = timeit.timeit(lambda: [parse_swap(s) for s in samples], number=number)
+    total = number * len(samples)
+    print(f"\nLegacy parsers:  {total / legacy_time:,.0f} messages/s")
+    print(f"parse_swap:      {total / parser_time:,.0f} messages/s")
+    print(f"Speedup:         {legacy_time / parser_time:.2f}x")
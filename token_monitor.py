@@ -3,12 +3,12 @@ import aiohttp
 from datetime import datetime, timedelta
 import statistics
 
-from MAbot import DexScreenerAPI
+from dexscreener import dex_client
 from marketcap import MarketcapFetcher
 from machannelscraper import ADScraper
 class TokenMonitor:
     def __init__(self):
-        self.dex = DexScreenerAPI()
+        self.dex = dex_client
         self.mc_rpc = MarketcapFetcher()
         self.ma_channel = ADScraper()
 
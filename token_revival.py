@@ -1,13 +1,14 @@
 import asyncio
-import aiohttp
-from DexTwo import DexTwo
+from dexscreener import dex_client
 import statistics
-from env import TOKEN, REVIVAL_WEBHOOK
+from env import REVIVAL_WEBHOOK
 from datetime import datetime, timedelta
+from discordclient import DiscordClient
+from dedup import BoundedDedup
+from embedfields import embed_parser
 
 class TokenRevivalMonitor:
     def __init__(self):
-        self.dex = DexTwo()
         self.revival_webhook = "https://discord.com/api/webhooks/1320785724714254466/vogQV02tbX4xo5ldYmDZnwrnaYbNgZLkOGNi5g170ileo5rFzwz7Mowd1QaRw3YTXw0c"
         self.monitoring_tasks = {}
         self.token_data = {}
@@ -34,8 +35,8 @@ class TokenRevivalMonitor:
         for minutes in self.interval_times:
             try:
                 await asyncio.sleep(minutes * 5)
-                await self.dex.fetch_mc(session, ca)
-                current_mc = self.dex.token_fdv
+                snapshot = await dex_client.snapshot(ca, batched=True, priority='background')
+                current_mc = snapshot.market_cap if snapshot else None
                 
                 if current_mc and current_mc > 0:
                     samples.append(current_mc)
@@ -76,8 +77,8 @@ class TokenRevivalMonitor:
             while datetime.now() < end_time:
                 try:
                     await asyncio.sleep(self.scanning_interval * 30)
-                    await self.dex.fetch_mc(session, ca)
-                    current_mc = self.dex.token_fdv
+                    snapshot = await dex_client.snapshot(ca, batched=True, priority='background')
+                    current_mc = snapshot.market_cap if snapshot else None
                     
                     if not current_mc:
                         continue
@@ -156,31 +157,26 @@ class TokenRevivalMonitor:
 
 class ScrapeMultiAlerts:
     def __init__(self):
-        self.url = "https://discord.com/api/v10/channels/{}/messages"
+        self.last_message_ids = {}
         self.revival_monitor = TokenRevivalMonitor()
         self.revival_webhook = REVIVAL_WEBHOOK
         
-    async def fetch_multi_alert(self, session, channel_id, channel_name):
-        headers = {'authorization': TOKEN}
-
-        processed_messages = set()
-        url = self.url.format(channel_id)
+    async def fetch_multi_alert(self, discord, channel_id, channel_name):
+        processed_messages = BoundedDedup(snowflake=True)
         print(f"\nStarting to monitor channel: {channel_name}")
         
         while True:
             try:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        messages = await response.json()
-                        if messages:
-                            latest_message = messages[0]
-                            message_id = latest_message['id']
-                            if message_id not in processed_messages:
-                                processed_messages.add(message_id)
-                                print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] New message in {channel_name}")
-                                await self.process_multi_alerts(session, latest_message, channel_name)
-                    else:
-                        print(f"[ERROR] Failed to fetch messages from {channel_name}: Status {response.status}")
+                status, messages = await discord.fetch_new_messages(channel_id, self.last_message_ids)
+                if status == 200:
+                    for message in messages:
+                        message_id = message['id']
+                        if message_id not in processed_messages:
+                            processed_messages.add(message_id)
+                            print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] New message in {channel_name}")
+                            await self.process_multi_alerts(discord.session, message, channel_name)
+                else:
+                    print(f"[ERROR] Failed to fetch messages from {channel_name}: Status {status}")
                 await asyncio.sleep(5)
 
             except Exception as e:
@@ -189,30 +185,20 @@ class ScrapeMultiAlerts:
 
     async def process_multi_alerts(self, session, message, channel_name):
         try:
-            embeds = message.get('embeds', [])
-            if not embeds:
+            parsed = embed_parser.parse(message, 'multi_alert')
+            if parsed is None:
                 return
             
-            embed = embeds[0]
-            fields = embed.get('fields', [])
-            
-            ca = None
+            ca = parsed.get('ca')
+            if 'ca' in parsed['fields'] and not ca:
+                print("Invalid CA format, skipping...")
+                return
+
             token_name = None
-            
-            for field in fields:
-                name = field.get('name', '').strip().lower()
-                value = field.get('value', '').strip()
-                
-                if name == 'ca':
-                    ca = value.strip('`')
-                    # In process_multi_alerts
-                    if not ca or ca == "" or len(ca) < 10:  # Basic validation
-                        print("Invalid CA format, skipping...")
-                        return
-                elif name == 'token name':
-                    token_name = value.strip().replace('\x00', '')  # Remove null bytes
-                    if not token_name:
-                        token_name = "Unknown Token"
+            if 'token_name' in parsed:
+                token_name = parsed['token_name'].replace('\x00', '')  # Remove null bytes
+                if not token_name:
+                    token_name = "Unknown Token"
                     
             if ca and token_name:
                 await self.revival_monitor.start_revival_monitoring(session, ca, token_name)
@@ -225,11 +211,11 @@ class Main:
         self.bot = ScrapeMultiAlerts()
         
     async def run_bot(self):
-        async with aiohttp.ClientSession() as session:
+        async with DiscordClient() as discord:
             # In Main.run_bot
             print("Starting Revival Monitor Bot...")
             tasks = [
-                self.bot.fetch_multi_alert(session, '1298438610663768154', 'Multi Alert Bot')
+                self.bot.fetch_multi_alert(discord, '1298438610663768154', 'Multi Alert Bot')
             ]
             await asyncio.gather(*tasks)
 
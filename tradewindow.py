@@ -0,0 +1,157 @@
+from array import array
+
+
+WINDOWS = {'1m': 60, '5m': 300, '1h': 3600}
+WINDOW_INDEX = {name: index for index, name in enumerate(WINDOWS)}
+BUCKETS = 12
+
+
+class TradeRing:
+    """A token's most recent trades in fixed-size parallel arrays.
+
+    Holds the last `capacity` trades (unix timestamp, SOL amount, side and
+    description id); appending to a full ring overwrites the oldest trade and
+    returns its description id so the caller can release it.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.amounts = array('d', bytes(8 * capacity))
+        self.sides = bytearray(capacity)   # 1 for a buy, 0 for a sell
+        self.description_ids = array('q', bytes(8 * capacity))
+        self.head = 0   # slot the next trade goes into
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, amount, is_buy, description_id):
+        evicted = self.description_ids[self.head] if self.size == self.capacity else None
+        self.timestamps[self.head] = timestamp
+        self.amounts[self.head] = amount
+        self.sides[self.head] = is_buy
+        self.description_ids[self.head] = description_id
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return evicted
+
+    def __iter__(self):
+        """(timestamp, amount, is_buy, description_id), oldest first"""
+        start = (self.head - self.size) % self.capacity
+        for offset in range(self.size):
+            slot = (start + offset) % self.capacity
+            yield self.timestamps[slot], self.amounts[slot], bool(self.sides[slot]), self.description_ids[slot]
+
+    def recent(self, is_buy, count):
+        """Description ids of the latest `count` buys (or sells), oldest first"""
+        found = []
+        for offset in range(1, self.size + 1):
+            slot = (self.head - offset) % self.capacity
+            if self.sides[slot] == is_buy:
+                found.append(self.description_ids[slot])
+                if len(found) == count:
+                    break
+        found.reverse()
+        return found
+
+
+class DecayedFlow:
+    """Buy and sell SOL with exponential time decay.
+
+    A trade's weight halves every `half_life` seconds, so the totals track the
+    current flow and an hour-old burst fades out instead of dominating. Both
+    sides decay together: each trade costs one multiplication, reading at a
+    later time scales without storing anything. A trade stamped before the
+    last update is added at its already-decayed weight.
+    """
+    __slots__ = ('half_life', 'buys', 'sells', 'updated_at')
+
+    def __init__(self, half_life, buys=0.0, sells=0.0, updated_at=0.0):
+        self.half_life = half_life
+        self.buys = buys
+        self.sells = sells
+        self.updated_at = updated_at
+
+    def add(self, timestamp, amount, is_buy):
+        if timestamp >= self.updated_at:
+            decay = 0.5 ** ((timestamp - self.updated_at) / self.half_life)
+            self.buys *= decay
+            self.sells *= decay
+            self.updated_at = timestamp
+        else:
+            amount *= 0.5 ** ((self.updated_at - timestamp) / self.half_life)
+        if is_buy:
+            self.buys += amount
+        else:
+            self.sells += amount
+
+    def value(self, now):
+        """(decayed buy SOL, decayed sell SOL) as of `now`"""
+        decay = 0.5 ** (max(now - self.updated_at, 0.0) / self.half_life)
+        return self.buys * decay, self.sells * decay
+
+    def export(self):
+        return (self.half_life, self.buys, self.sells, self.updated_at)
+
+
+class RollingSums:
+    """Buy and sell SOL over the last minute, 5 minutes and hour.
+
+    Each window is split into BUCKETS time buckets kept in a small ring, so
+    adding a trade and reading a window cost the same however busy the token
+    is, and memory is fixed. A window covers its last BUCKETS buckets, the
+    newest one partially filled (e.g. 55-60 seconds for '1m'). Trades older
+    than a window's oldest bucket are left out of it.
+    """
+    widths = [span / BUCKETS for span in WINDOWS.values()]
+    empty_epochs = array('q', [-1] * len(WINDOWS) * BUCKETS)
+    empty_sums = array('d', bytes(8 * len(WINDOWS) * BUCKETS))
+
+    def __init__(self):
+        self.epochs = self.empty_epochs[:]   # absolute bucket number held by each slot
+        self.buys = self.empty_sums[:]
+        self.sells = self.empty_sums[:]
+
+    def add(self, timestamp, amount, is_buy):
+        for window, width in enumerate(self.widths):
+            epoch = int(timestamp // width)
+            slot = window * BUCKETS + epoch % BUCKETS
+            if self.epochs[slot] != epoch:
+                if self.epochs[slot] > epoch:
+                    continue   # The slot already moved on to a newer bucket
+                self.epochs[slot] = epoch
+                self.buys[slot] = 0.0
+                self.sells[slot] = 0.0
+            if is_buy:
+                self.buys[slot] += amount
+            else:
+                self.sells[slot] += amount
+
+    def window(self, name, now):
+        """(buy SOL, sell SOL) in window `name` as of `now`"""
+        index = WINDOW_INDEX[name]
+        newest = int(now // self.widths[index])
+        buys = sells = 0.0
+        for slot in range(index * BUCKETS, (index + 1) * BUCKETS):
+            if newest - BUCKETS < self.epochs[slot] <= newest:
+                buys += self.buys[slot]
+                sells += self.sells[slot]
+        return buys, sells
+
+    def all(self, now):
+        """{window name: (buy SOL, sell SOL)}"""
+        return {name: self.window(name, now) for name in WINDOWS}
+
+    def export(self):
+        """Occupied buckets only, as (slot, bucket number, buy SOL, sell SOL)"""
+        return [(slot, epoch, self.buys[slot], self.sells[slot])
+                for slot, epoch in enumerate(self.epochs) if epoch >= 0]
+
+    @classmethod
+    def restore(cls, buckets):
+        sums = cls()
+        for slot, epoch, buys, sells in buckets:
+            sums.epochs[slot] = epoch
+            sums.buys[slot] = buys
+            sums.sells[slot] = sells
+        return sums